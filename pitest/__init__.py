@@ -10,12 +10,18 @@ Features of PITEST:
 """
 
 from .args import Args, ArgsError
+from .asyncrunner import AsyncRunner
+from .cache import CacheError, DiscoverCache, TestCaseInfo
 from .case import TestCase
-from .dag import DAG, Py3DAGError
+from .dag import DAG, FrozenDAG, Py3DAGCycleError, Py3DAGError
 from .discover import Discover, DiscoverError
+from .distributed import Coordinator, DistributedError, Worker
 from .main import Main
-from .name import PyName, PyNameError
+from .name import NameIndex, PyName, PyNameError
+from .priority import CriticalPath, DurationHistory, PriorityError
+from .registry import Registry, RegistryError
 from .result import TestCaseResult, TestSuiteResult
-from .runner import Runner
-from .scheduler import Scheduler, SchedulerError
+from .runner import Runner, RunnerError
+from .scheduler import ConcurrentScheduler, Scheduler, SchedulerError
+from .selection import SelectionError, Selector
 from .suite import TestSuiteBase, TestSuiteBaseError
@@ -3,9 +3,6 @@
 import pitest
 
 import argparse
-import inspect
-import os
-import re
 import sys
 
 if __name__ == '__main__':
@@ -24,8 +21,43 @@ if __name__ == '__main__':
         default = False,
         help = 'recursively scan the start-dir')
     parser.add_argument('--file-pattern', type = str,
+        nargs = '+',
         default = '*.py',
-        help = 'pattern of files to scan')
+        help = 'patterns of files to scan')
+    parser.add_argument('--exclude', type = str,
+        nargs = '+',
+        default = [],
+        help = '''patterns of files and directories to skip, in addition to
+                {} and virtual environments'''.format(
+                    ', '.join(pitest.discover.DEFAULT_EXCLUDES)))
+    parser.add_argument('--gitignore', action = 'store_true',
+        default = False,
+        help = 'skip files and directories ignored by .gitignore files')
+    parser.add_argument('--prescan', action = 'store_true',
+        default = False,
+        help = '''parse files first and only import those that may define
+                test cases''')
+    parser.add_argument('--lazy', action = 'store_true',
+        default = False,
+        help = '''parse files instead of importing them, only import the files
+                of the test cases that are run''')
+    parser.add_argument('--cache', type = str,
+        default = None,
+        metavar = 'FILE',
+        help = '''discovery cache file, test cases of unchanged files are
+                listed without importing them''')
+    parser.add_argument('--modules', type = str,
+        nargs = '+',
+        default = None,
+        help = '''load test cases registered by these modules instead of
+                scanning the start-dir''')
+    parser.add_argument('--entry-points', type = str,
+        nargs = '?',
+        default = None,
+        const = pitest.registry.ENTRY_POINT_GROUP,
+        metavar = 'GROUP',
+        help = '''load test cases registered by the modules listed in this
+                entry point group instead of scanning the start-dir''')
 
     subparsers = parser.add_subparsers(dest = 'command')
 
@@ -38,15 +70,23 @@ if __name__ == '__main__':
 
     sp = subparsers.add_parser('run',
         formatter_class = argparse.ArgumentDefaultsHelpFormatter,
-        description = 'Can only run tests that do not take any arguments.')
+        description = '''Run the selected tests, and the tests they depend on.
+                Test arguments are taken from --args-file.''')
     sp.add_argument('run_kind', metavar = 'KIND',
         type = str,
-        choices = ['case', 'method'],
-        help = 'what kind of target to run, one of [ case, method ]')
+        choices = pitest.selection.TARGET_KINDS,
+        help = '''what kind of target to run, one of [ case, method, test ],
+                method and test are the same''')
     sp.add_argument('run_target_name', metavar = 'TARGET',
         type = str,
-        #nargs = '+',
-        help = 'name of the target to run')
+        nargs = '*',
+        help = '''names or glob patterns of the test cases or test methods to
+                run, see pitest.Selector. None = all''')
+    sp.add_argument('-k', dest = 'keyword', type = str,
+        default = None,
+        metavar = 'EXPRESSION',
+        help = '''only run tests whose names match this expression of words,
+                'and', 'or', 'not' and parentheses, see pitest.Selector''')
     sp.add_argument('--args-file',
         default = None,
         help = '''python3 source file that defines the args_obj.
@@ -61,13 +101,28 @@ if __name__ == '__main__':
 
     args = parser.parse_args()
 
-    if args.command in ['discover', 'run']:
-        testcases = pitest.Discover.discover(
+    suite = pitest.TestSuiteBase()
+    suite.testcase_baseclasses = args.basecases
+    if args.command in ['discover', 'run'] and (args.modules
+            or args.entry_points):
+        if args.modules:
+            suite.load_modules(args.modules, notestcase_ok = True)
+        if args.entry_points:
+            suite.load_entry_points(args.entry_points, notestcase_ok = True)
+    elif args.command in ['discover', 'run']:
+        suite.discover(
             args.start_dir,
-            baseclasses = args.basecases,
             recursive = args.recursive,
-            pattern = args.file_pattern
+            pattern = args.file_pattern,
+            exclude = list(pitest.discover.DEFAULT_EXCLUDES) + args.exclude,
+            skip_venv = True,
+            gitignore = args.gitignore,
+            prescan = args.prescan,
+            lazy = args.lazy,
+            cache = pitest.DiscoverCache(args.cache) if args.cache else None,
+            notestcase_ok = True,
         )
+    testcases = suite.testcases
 
     if args.command == 'discover':
         if args.discover_kind == 'case':
@@ -75,72 +130,32 @@ if __name__ == '__main__':
                 print(full_cls_name)
         elif args.discover_kind == 'method':
             for full_cls_name, cls in testcases:
-                for method_name, method in cls._get_all_tests_class():
+                for method_name in cls._get_test_method_names():
                     print('{}.{}'.format(full_cls_name, method_name))
         elif args.discover_kind == 'all':
             for full_cls_name, cls in testcases:
                 print(full_cls_name)
-                for method_name, method in cls._get_all_tests_class():
+                for method_name in cls._get_test_method_names():
                     print('{}.{}'.format(full_cls_name, method_name))
 
     elif args.command == 'run':
         # Create an Args object.
         args_obj = None
-        init_args, init_kwargs = ((), {})
         if args.args_file:
             with open(args.args_file, 'r', encoding = 'utf8') as f:
                 args_obj = pitest.Main.get_args_obj_from_source_code(
                     f.read(), args_name = args.args_name)
-            init_args, init_kwargs = args_obj.get_method_args('__init__')
-        if args.run_kind == 'case':
-            testcases_to_run = pitest.Main.find_all_test_cases_by_name(
-                args.run_target_name, testcases)
-            for full_cls_name, cls in testcases_to_run:
-                cls_instance = cls(*init_args, **init_kwargs)
-                result = pitest.Runner.run_test_case(
-                    cls_instance,
-                    args_obj,
-                    fullname = full_cls_name,
-                )
-                print(result)
-        elif args.run_kind == 'method':
-            test_args, test_kwargs = args_obj.get_method_args('test') if args_obj else ((), {})
-
-            target_cls_name, target_method_name = os.path.splitext(args.run_target_name)
-            full_reg_pattern = '^({0})|(.*\.{0})$'.format(args.run_target_name)
-            full_reg_engine = re.compile(full_reg_pattern)
-            cls_reg_pattern = '^({0})|(.*\.{0})$'.format(target_cls_name)
-            cls_reg_engine = re.compile(cls_reg_pattern)
-            # os.path.splitext('.method_name') => ('.method_name', '')
-            if not target_method_name:
-                # '.method_name' or 'method_name', brute force search.
-                for full_cls_name, cls in testcases:
-                    for method_name, cls_method in cls._get_all_tests_class():
-                        full_method_name = full_cls_name + '.' + method_name
-                        if not full_reg_engine.match(full_method_name):
-                            continue
-                        # Instantiate the class, call the test method.
-                        cls_instance = cls(*init_args, **init_kwargs)
-                        info = inspect.getmembers(cls_instance, inspect.ismethod)
-                        for name, method in info:
-                            ful_name = full_cls_name + '.' + name
-                            if full_reg_engine.match(ful_name):
-                                method(*test_args, **test_kwargs)
-                        break
-            else:
-                # '.partial_cls_name.method_name', match the class name first.
-                for full_cls_name, cls in testcases:
-                    if not cls_reg_engine.match(full_cls_name):
-                        continue
-                    for method_name, cls_method in cls._get_all_tests_class():
-                        full_method_name = full_cls_name + '.' + method_name
-                        if not full_reg_engine.match(full_method_name):
-                            continue
-                        # Instantiate the class, call the test method.
-                        cls_instance = cls(*init_args, **init_kwargs)
-                        info = inspect.getmembers(cls_instance, inspect.ismethod)
-                        for name, method in info:
-                            ful_name = full_cls_name + '.' + name
-                            if full_reg_engine.match(ful_name):
-                                method(*test_args, **test_kwargs)
-                        break
+        selected = suite.select(args.run_target_name or None,
+                keyword = args.keyword, kind = args.run_kind)
+        if not selected:
+            print('No test matches {}'.format(' '.join(args.run_target_name
+                + ([ '-k', args.keyword ] if args.keyword else []))),
+                file = sys.stderr)
+            sys.exit(1)
+        result = pitest.Runner.run_test_suite(suite, args_obj)
+        for testcase_result in result.testcase_results:
+            print(testcase_result)
+        if result.num_blocked:
+            print('BLOCKED: {}'.format(result.num_blocked))
+        if result.num_unknown:
+            print('UNKNOWN: {}'.format(result.num_unknown))
@@ -0,0 +1,174 @@
+from . import result
+from . import runner
+from . import scheduler
+
+import asyncio
+import inspect
+import time
+
+class AsyncRunner(object):
+    """Run test cases whose methods may be coroutine functions.
+
+    setup(), teardown(), setup_instance(), teardown_instance() and test methods
+    can be either plain methods or coroutine functions, i.e., 'async def'.
+    Coroutines are awaited, plain methods are called directly in the event
+    loop. All test cases of a suite are driven by a single event loop, so
+    thousands of I/O bound test cases can overlap on one thread.
+
+    Test methods within one test case run one at a time because they share the
+    same test case instance, unless the test case sets parallel_methods.
+    """
+
+    @staticmethod
+    def run_test_suite(suite, args_obj = None, *, concurrency = 64,
+            priority = None):
+        """Run all test cases for the test suite in a new event loop.
+
+        Returns:
+            An newly-created TestSuiteResult object that has all information
+            about this run. Test case results are listed in the order
+            Runner.run_test_suite() would have run them.
+
+        Args:
+            suite: An instance of a subclass of pitest.TestSuiteBase.
+            args_obj: An instance of Args.
+            concurrency: Maximum number of test cases running at the same time.
+            priority: Sort key of full class names of test cases, see
+                Runner.run_test_suite().
+
+        Raises:
+            RunnerError: concurrency is less than 1.
+        """
+        return asyncio.run(AsyncRunner.run_test_suite_async(suite, args_obj,
+            concurrency = concurrency, priority = priority))
+
+    @staticmethod
+    async def run_test_suite_async(suite, args_obj = None, *, concurrency = 64,
+            priority = None):
+        """Coroutine version of run_test_suite(), for use in a running loop."""
+        if concurrency < 1:
+            raise runner.RunnerError('concurrency must be at least 1, got {}'
+                    .format(concurrency))
+
+        res = result.TestSuiteResult(suite.__class__.__name__, args_obj)
+
+        graph = suite.get_deps_graph()
+        sched = scheduler.Scheduler(graph, deepcopy = False, priority = priority)
+        args, kwargs = ((), {}) if args_obj is None else args_obj.get_method_args('__init__')
+        def start(task_id):
+            testcase_instance = graph.get_data(task_id)(*args, **kwargs)
+            return AsyncRunner.run_test_case(testcase_instance, args_obj,
+                    fullname = task_id)
+        testcase_results = await AsyncRunner._run_tasks_concurrently(sched,
+                start, concurrency, succeeded = lambda res: res.success)
+
+        succeeded = { task_id: testcase_result.success for task_id,
+                testcase_result in testcase_results.items() }
+        for task_id in runner.Runner._serial_order(graph, succeeded,
+                priority = priority):
+            res.add_test_case_result(testcase_results[task_id])
+        res.set_blocked_testcases(sched.blocked_tasks)
+        res.set_unknown_testcases(sched.unknown_tasks)
+
+        return res
+
+    @staticmethod
+    async def run_test_case(case, args_obj = None, *, fullname = None):
+        """Run all test methods for the test case, awaiting coroutines.
+
+        Returns:
+            An newly-created TestCaseResult object that has all information
+            about this run.
+
+        Args:
+            case: An instance of a subclass of pitest.TestCase.
+            args_obj: An instance of Args.
+            fullname: The full name of the test case. If None, just use
+                case.__class__.__name__.
+        """
+        testcase_name = fullname if fullname else case.__class__.__name__
+        res = result.TestCaseResult(testcase_name)
+        start_time = time.perf_counter()
+
+        graph = case.get_deps_graph()
+        sched = scheduler.Scheduler(graph, deepcopy = False)
+        await AsyncRunner._call_method_with_args(case.setup_instance, args_obj)
+        if case.parallel_methods:
+            start = lambda task_id: AsyncRunner._run_test_method(case,
+                    graph.get_data(task_id), args_obj)
+            retvals = await AsyncRunner._run_tasks_concurrently(sched, start,
+                    runner.Runner._method_workers(case),
+                    succeeded = lambda retval: retval is None)
+            succeeded = { task_id: retval is None for task_id, retval in retvals.items() }
+            for task_id in runner.Runner._serial_order(graph, succeeded):
+                if retvals[task_id] is None:
+                    res.add_success(task_id)
+                else:
+                    res.add_failure(task_id, retvals[task_id])
+        else:
+            while sched.available_tasks:
+                task_id = sched.pop_next()
+                retval = await AsyncRunner._run_test_method(case,
+                        graph.get_data(task_id), args_obj)
+                if retval is None:
+                    sched.deliver_task(task_id)
+                    res.add_success(task_id)
+                else:
+                    sched.fail_task(task_id)
+                    res.add_failure(task_id, retval)
+        await AsyncRunner._call_method_with_args(case.teardown_instance, args_obj)
+
+        res.set_blocked_tests(sched.blocked_tasks)
+        res.set_unknown_tests(sched.unknown_tasks)
+        res.set_duration(time.perf_counter() - start_time)
+
+        return res
+
+    @staticmethod
+    async def _run_test_method(case, test_method, args_obj):
+        """Run a test method bracketed by case.setup() and case.teardown().
+
+        Returns:
+            What the test method returns, None means success.
+        """
+        await AsyncRunner._call_method_with_args(case.setup, args_obj)
+        retval = await AsyncRunner._call_method_with_args(test_method, args_obj)
+        await AsyncRunner._call_method_with_args(case.teardown, args_obj)
+        return retval
+
+    @staticmethod
+    async def _run_tasks_concurrently(sched, start, limit, *, succeeded):
+        """Keep up to @limit tasks of @sched running until none is left.
+
+        Same as Runner._run_tasks_concurrently(), except that @start takes a
+        task id and returns a coroutine instead of a future.
+        """
+        results = {}
+        running = {}
+        try:
+            while sched.available_tasks or running:
+                while len(running) < limit:
+                    task_id = sched.pop_next()
+                    if task_id is None:
+                        break
+                    running[asyncio.ensure_future(start(task_id))] = task_id
+                done, _ = await asyncio.wait(running,
+                        return_when = asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task_id = running.pop(task)
+                    results[task_id] = task.result()
+                    if succeeded(results[task_id]):
+                        sched.deliver_task(task_id)
+                    else:
+                        sched.fail_task(task_id)
+        finally:
+            for task in running:
+                task.cancel()
+        return results
+
+    @staticmethod
+    async def _call_method_with_args(method, args_obj):
+        retval = runner.Runner._call_method_with_args(method, args_obj)
+        if inspect.isawaitable(retval):
+            retval = await retval
+        return retval
@@ -0,0 +1,259 @@
+from . import discover
+
+import hashlib
+import json
+import os
+import sys
+
+class CacheError(Exception):
+    pass
+
+# Bumped whenever the layout of cache files changes, older files are ignored.
+_CACHE_VERSION = 1
+
+# Source files of pitest itself are not tracked as dependencies of cache
+# entries.
+_PITEST_DIR = os.path.dirname(os.path.realpath(__file__))
+
+class TestCaseInfo(object):
+    """What discovery found out about a test case, without importing it.
+
+    Stands in for the test case class in the (full_cls_name, cls) tuples of
+    discovered test cases. What is known of the class, e.g., its deps and its
+    test method names, is available without importing anything. So listing
+    test cases and building the dependency graph of a suite may import
+    nothing. Calling it, e.g., when a Runner instantiates the test case it
+    scheduled, or getting anything else, imports the file and loads the
+    class, once.
+    """
+
+    def __init__(self, fname, full_cls_name, entry, baseclasses, *,
+            lazy = False):
+        """
+        Args:
+            fname: The file defining the test case, as given to discover().
+            full_cls_name: The full class name, see Discover.load_file().
+            entry: A dictionary like the ones stored in the cache for test
+                cases, see DiscoverCache. Only 'name' is required, missing
+                values are taken from the class when needed.
+            baseclasses: The base classes the test case was discovered with.
+            lazy: True if the file was only parsed, see Discover.discover(),
+                False if the entry was cached after importing it.
+        """
+        self._fname = fname
+        self._full_cls_name = full_cls_name
+        self._baseclasses = list(baseclasses)
+        self._lazy = lazy
+        self._cls = None
+        self.__name__ = entry['name']
+        if 'deps' in entry:
+            self.deps = entry['deps']
+        if 'internal_deps' in entry:
+            self._internal_deps = entry['internal_deps']
+        self._test_method_names = None
+        if 'test_methods' in entry:
+            self._test_method_names = tuple(entry['test_methods'])
+
+    def __repr__(self):
+        return '<TestCaseInfo {}>'.format(self._full_cls_name)
+
+    def _get_test_method_names(self):
+        if self._test_method_names is None:
+            return self.load()._get_test_method_names()
+        return self._test_method_names
+
+    def load(self):
+        """Import the file and return the test case class.
+
+        Raises:
+            CacheError: The file no longer defines the test case, the cache is
+                stale.
+            DiscoverError: The file does not define the test case parsing it
+                found, lazily discovered test cases only.
+        """
+        if self._cls is None:
+            for full_cls_name, cls in discover.Discover.load_file(self._fname,
+                    baseclasses = self._baseclasses):
+                if full_cls_name == self._full_cls_name:
+                    self._cls = cls
+                    break
+            else:
+                if self._lazy:
+                    raise discover.DiscoverError("'{}' does not define test "
+                        "case '{}', found by parsing it without importing "
+                        "it".format(self._fname, self._full_cls_name))
+                raise CacheError("'{}' no longer defines test case '{}'".format(
+                    self._fname, self._full_cls_name))
+        return self._cls
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # Only called for attributes not set in __init__(). Never load for
+        # special names, e.g., when pickle looks for __setstate__.
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+class DiscoverCache(object):
+    """On-disk cache of discovered test cases.
+
+    Stored as a JSON file mapping the real paths of discovered files to what
+    Discover.load_file() found in them, given the same base classes:
+        {
+            "version": 1,
+            "files": {
+                "/abs/path/foo.py": {
+                    "baseclasses": [ "TestCase" ],
+                    "sources": { "/abs/path/foo.py": [ mtime_ns, size, sha256 ],
+                                 "/abs/path/base.py": [ ... ] },
+                    "testcases": [ { "name": "Case1", "deps": [ ... ],
+                                     "internal_deps": { ... },
+                                     "test_methods": [ ... ] } ]
+                }
+            }
+        }
+
+    "sources" lists the file itself and the files defining the base classes of
+    its test cases, as deps and test methods can be inherited. An entry is
+    used only if none of its sources changed. A source whose modification
+    time changed but whose size and content did not is still unchanged.
+
+    Typical use:
+        cache = pitest.DiscoverCache('.pitest-cache.json')
+        suite.discover('tests', cache = cache)
+    """
+
+    def __init__(self, fname = None):
+        """
+        Args:
+            fname: The JSON file to load from and save to. Loaded if it exists.
+                None = start empty and do not persist.
+
+        Raises:
+            CacheError: The file exists but is not a valid cache file.
+        """
+        self._fname = fname
+        self._files = {}
+        self._dirty = False
+        # { (realpath, mtime_ns, size, sha256) : bool }, sources already
+        # checked in this process.
+        self._unchanged = {}
+        if fname and os.path.exists(fname):
+            self.load()
+
+    @property
+    def fname(self):
+        return self._fname
+
+    @property
+    def dirty(self):
+        """True if the cache changed since it was loaded or saved."""
+        return self._dirty
+
+    def lookup(self, fname, baseclasses):
+        """Cached test cases of a file.
+
+        Returns:
+            A list of (full_cls_name, TestCaseInfo) tuples, or None if the file
+            is not cached for these base classes or changed since.
+        """
+        entry = self._files.get(os.path.realpath(fname))
+        if entry is None or entry['baseclasses'] != list(baseclasses):
+            return None
+        for source, stat in entry['sources'].items():
+            if not self._is_unchanged(source, stat):
+                return None
+        prefix = discover.Discover._convert_path(fname)
+        return [ ('{}.{}'.format(prefix, testcase['name']),
+                TestCaseInfo(fname, '{}.{}'.format(prefix, testcase['name']),
+                    testcase, baseclasses))
+                for testcase in entry['testcases'] ]
+
+    def store(self, fname, baseclasses, testcases):
+        """Cache the test cases Discover.load_file() found in a file.
+
+        Args:
+            testcases: A list of (full_cls_name, cls) tuples.
+        """
+        realpath = os.path.realpath(fname)
+        sources = { realpath }
+        entries = []
+        for full_cls_name, cls in testcases:
+            for super_cls in cls.__mro__:
+                module = sys.modules.get(super_cls.__module__)
+                source = getattr(module, '__file__', None)
+                if source and source.endswith('.py'):
+                    source = os.path.realpath(source)
+                    if os.path.dirname(source) != _PITEST_DIR:
+                        sources.add(source)
+            internal_deps = { src: [ dst ] if isinstance(dst, str) else list(dst)
+                    for src, dst in cls._internal_deps.items() }
+            entries.append({
+                'name': full_cls_name.rsplit('.', 1)[-1],
+                'deps': list(cls.deps),
+                'internal_deps': internal_deps,
+                'test_methods': list(cls._get_test_method_names()),
+            })
+        self._files[realpath] = {
+            'baseclasses': list(baseclasses),
+            'sources': { source: DiscoverCache._stat(source)
+                for source in sorted(sources) },
+            'testcases': entries,
+        }
+        self._dirty = True
+
+    def load(self):
+        try:
+            with open(self._fname, 'r', encoding = 'utf8') as f:
+                data = json.load(f)
+        except ValueError as e:
+            raise CacheError("Cannot load discovery cache '{}': {}".format(
+                self._fname, e))
+        if not isinstance(data, dict) or not isinstance(data.get('files'), dict):
+            raise CacheError("Discovery cache '{}' must be a JSON object with 'files'"
+                    .format(self._fname))
+        self._files = data['files'] if data.get('version') == _CACHE_VERSION else {}
+        self._dirty = False
+
+    def save(self):
+        if not self._fname:
+            raise CacheError('Cannot save a discovery cache without file name')
+        tmp_fname = self._fname + '.tmp'
+        with open(tmp_fname, 'w', encoding = 'utf8') as f:
+            json.dump({ 'version': _CACHE_VERSION, 'files': self._files }, f,
+                    indent = 1, sort_keys = True)
+        os.replace(tmp_fname, self._fname)
+        self._dirty = False
+
+    def _is_unchanged(self, source, stat):
+        """Is the file @source the same as when @stat was taken.
+
+        Updates the modification time in @stat if only that changed.
+        """
+        key = (source, ) + tuple(stat)
+        if not key in self._unchanged:
+            mtime_ns, size, digest = stat
+            try:
+                st = os.stat(source)
+            except OSError:
+                st = None
+            unchanged = not st is None and st.st_size == size and (
+                    st.st_mtime_ns == mtime_ns
+                    or DiscoverCache._hash(source) == digest)
+            if unchanged and st.st_mtime_ns != mtime_ns:
+                stat[0] = st.st_mtime_ns
+                self._dirty = True
+            self._unchanged[key] = unchanged
+        return self._unchanged[key]
+
+    @staticmethod
+    def _stat(source):
+        st = os.stat(source)
+        return [ st.st_mtime_ns, st.st_size, DiscoverCache._hash(source) ]
+
+    @staticmethod
+    def _hash(source):
+        with open(source, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
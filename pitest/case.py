@@ -1,8 +1,18 @@
 from . import dag
+from . import registry
 
 import fnmatch
 import inspect
 import re
+import weakref
+
+# Maps test case classes to the 3-tuples (test method names, _internal_deps,
+# edges) last resolved by TestCase.get_deps_graph().
+_internal_deps_cache = weakref.WeakKeyDictionary()
+
+# Maps test case classes to the 2-tuples (stamp, test method names), see
+# TestCase._get_test_method_names().
+_test_methods_cache = weakref.WeakKeyDictionary()
 
 class TestCase(object):
     """Base test case class.
@@ -30,14 +40,35 @@ class TestCase(object):
             Discover.discover.__doc__ in discover.py.
         _internal_deps: Dependencies between test methods in this test case,
             stored as a dictionary that maps targets to prerequisites. Support
-            glob patterns.
+            glob patterns. A single prerequisite pattern may be given as a
+            string instead of a list.
                 Example:
-                    { 'test_foo*' : [ 'test_bar*', 'test_foo*bar' ] }
+                    { 'test_foo*' : [ 'test_bar*', 'test_foo*bar' ],
+                      'test_baz' : 'test_foo' }
+        parallel_methods: False to run test methods one at a time. True, or a
+            positive integer limiting the number of concurrent test methods, to
+            run test methods that do not depend on each other concurrently.
+            Every test method still runs between its own setup() and
+            teardown(), and all of them run between setup_instance() and
+            teardown_instance(). Only turn it on if the test methods, setup()
+            and teardown() are safe to run concurrently on the same instance.
+        register: False in the body of a class to keep it out of the
+            Registry, e.g., for helper base classes. Not inherited.
     """
 
     test_patterns = [ 'test_*', ]
     deps = []
     _internal_deps = {}
+    parallel_methods = False
+    # Names of the test methods to run, with their prerequisites, None = all.
+    # Set on instances created for a suite selecting tests, see
+    # TestSuiteBase.select().
+    _selected_tests = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._get_test_method_names()
+        registry.Registry.register(cls)
 
     def setup(self, *args, **kwargs):
         pass
@@ -61,28 +92,114 @@ class TestCase(object):
 
         Raises:
             Py3DAGError: When cyclic dependency is detected, with the exception
-            of self-dependency.
+            of self-dependency. Py3DAGCycleError lists the whole cycle.
+
+        The edges are resolved once per class and cached, as long as the test
+        method names and the _internal_deps object stay the same. Altering
+        _internal_deps in place is not detected, assign a new dictionary.
+
+        If only some tests of this instance are selected, see
+        TestSuiteBase.select(), the graph only has them and their
+        prerequisites, direct or not.
         """
+        graph = self._get_all_deps_graph()
+        if not self._selected_tests is None:
+            graph = graph.induced_subgraph(graph.closure(self._selected_tests))
+        return graph
+
+    def _get_all_deps_graph(self):
         graph = dag.DAG()
         for test in self._get_all_tests():
             graph.add_node(*test)
-        for src_pattern, dst_pattern_list in self._internal_deps.items():
-            src_reg = fnmatch.translate(src_pattern)
-            for dst_pattern in dst_pattern_list:
-                dst_reg = fnmatch.translate(dst_pattern)
-                # Add edges (src -> dst) to graph
-                for src in graph._nodes.keys():
-                    for dst in graph._nodes.keys():
-                        if src == dst: # Ignore self dependency.
-                            continue
-                        if re.match(src_reg, src) and re.match(dst_reg, dst):
-                            graph.add_edge(src, dst)
+        names = tuple(graph._nodes)
+        cached = _internal_deps_cache.get(self.__class__)
+        if (not cached is None and cached[0] == names
+                and cached[1] is self._internal_deps):
+            for src, dst in cached[2]:
+                graph.add_edge(src, dst)
+            return graph
+
+        edges = TestCase._resolve_internal_deps(names, self._internal_deps)
+        for src, dst in edges:
+            graph.add_edge(src, dst)
+        graph.check_acyclic(raise_error = True)
+        _internal_deps_cache[self.__class__] = (names, self._internal_deps, edges)
         return graph
 
+    @staticmethod
+    def _resolve_internal_deps(names, internal_deps):
+        """Resolve _internal_deps into edges between test method names.
+
+        Each pattern is matched once against @names, the edges are the cross
+        product of the targets and prerequisites matched.
+
+        Returns:
+            A list of (src, dst) tuples, without self dependencies.
+        """
+        matched = {}
+        def match(pattern):
+            if not pattern in matched:
+                reg = re.compile(fnmatch.translate(pattern))
+                matched[pattern] = [ name for name in names if reg.match(name) ]
+            return matched[pattern]
+
+        edges = []
+        for src_pattern, dst_pattern_list in internal_deps.items():
+            if isinstance(dst_pattern_list, str):
+                dst_pattern_list = [ dst_pattern_list ]
+            srcs = match(src_pattern)
+            for dst_pattern in dst_pattern_list:
+                for src in srcs:
+                    for dst in match(dst_pattern):
+                        if src != dst: # Ignore self dependency.
+                            edges.append((src, dst))
+        return edges
+
+    @classmethod
+    def _get_test_method_names(self_cls):
+        """
+        Return a tuple of the names of test methods, i.e., the methods whose
+        names match one or more of the patterns listed in test_patterns of this
+        class. Patterns are taken in order, names matched by each pattern are
+        sorted, and a name matched by several patterns is listed once. Only
+        methods bound to the instances count, static and class methods do not.
+
+        Computed once per class, when the class is created, and again after an
+        attribute of the class or of one of its base classes is added or
+        deleted, or test_patterns is assigned. The cached names are stamped
+        with test_patterns and the attribute names of the classes in the MRO,
+        which is cheaper to compare than matching the patterns again.
+        Altering test_patterns in place is not detected, assign a new list.
+        """
+        stamp = (self_cls.test_patterns,
+                tuple(tuple(vars(cls)) for cls in self_cls.__mro__))
+        cached = _test_methods_cache.get(self_cls)
+        if (not cached is None and cached[0][0] is stamp[0]
+                and cached[0][1] == stamp[1]):
+            return cached[1]
+
+        attrs = {}
+        for cls in self_cls.__mro__:
+            for name, value in vars(cls).items():
+                attrs.setdefault(name, value)
+        members = sorted(name for name, value in attrs.items()
+                if inspect.isfunction(value))
+        names = []
+        seen = set()
+        for pattern in self_cls.test_patterns:
+            reg = re.compile(fnmatch.translate(pattern))
+            for name in members:
+                if reg.match(name) and not name in seen:
+                    seen.add(name)
+                    names.append(name)
+        names = tuple(names)
+        _test_methods_cache[self_cls] = (stamp, names)
+        return names
+
     def _get_all_tests(self):
         """
         Return a list of (name, method) tuples whose names match one or more of
-        the patterns listed in TestCase.test_patterns.
+        the patterns listed in test_patterns.
 
         The returned methods are bound to the instance of the test case
         subclass and are callable.
@@ -90,29 +207,17 @@ class TestCase(object):
         This method allows TestSuiteBase to know what test methods are available
         in this test case.
         """
-        test_methods = []
-        for pattern in TestCase.test_patterns:
-            reg_pattern = fnmatch.translate(pattern)
-            cls_methods = inspect.getmembers(self, inspect.ismethod)
-            for name, cls in cls_methods:
-                if re.match(reg_pattern, name):
-                    test_methods.append((name, cls))
-        return test_methods
+        return [ (name, getattr(self, name))
+                for name in self._get_test_method_names() ]
 
     @classmethod
     def _get_all_tests_class(self_cls):
         """
         Return a list of (name, method) tuples whose names match one or more of
-        the patterns listed in TestCase.test_patterns.
+        the patterns listed in test_patterns.
 
         The returned methods are NOT bound to the instance of the test case
         subclass and are callable.
         """
-        test_methods = []
-        for pattern in self_cls.test_patterns:
-            reg_pattern = fnmatch.translate(pattern)
-            cls_methods = inspect.getmembers(self_cls, inspect.isfunction)
-            for name, cls in cls_methods:
-                if re.match(reg_pattern, name):
-                    test_methods.append((name, cls))
-        return test_methods
+        return [ (name, getattr(self_cls, name))
+                for name in self_cls._get_test_method_names() ]
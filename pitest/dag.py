@@ -1,15 +1,35 @@
+import array
+import itertools
 import pprint
 import sys
 
+_BIN_DIGITS = bytes.maketrans(b'01', b'\x00\x01')
+
 class Py3DAGError(Exception):
     pass
 
+class Py3DAGCycleError(Py3DAGError):
+    def __init__(self, cycle):
+        """
+        Args:
+            cycle: List of node ids [ n0, n1, ..., nk ] such that
+                n0 -> n1 -> ... -> nk -> n0.
+        """
+        self.cycle = cycle
+        path = ' -> '.join(repr(id) for id in cycle + cycle[:1])
+        super().__init__('Cycle detected: {}'.format(path))
+
 class DAG(object):
     """Directed Acyclic Graph, used by pitest.Scheduler.
     """
 
-    def __init__(self):
+    def __init__(self, *, incremental = False):
         """
+        incremental:
+            True to keep a topological order of the nodes up to date while
+            edges are added, so that add_edge() rejects any edge closing a
+            cycle, not only backedges. See add_edge().
+
         _nodes :
             { id : data }
             id:   an id to uniquely identify the node in a graph
@@ -22,6 +42,19 @@ class DAG(object):
             _in:  incoming edges, { 'a' : { 'b', 'c' } } means a <- b, c.
             _out: outgoing edges, { 'a' : { 'b', 'c' } } means a -> b, c.
 
+        _ord, _next_ord:
+            Only in incremental mode, None otherwise.
+            _ord: { id : int }, a topological order, a -> b means
+                _ord[a] < _ord[b]. Not necessarily contiguous.
+            _next_ord: the order given to the next added node.
+
+        _reach:
+            Memoized reachability, see descendants() and ancestors(). None
+            until the first query, reset to None by every add_ and del_
+            method. Otherwise, a tuple (ids, index, { '_out' : memo, '_in' :
+            memo }), where memo maps node ids to int bitsets of the nodes
+            reachable from them, bit i standing for ids[i].
+
         Methods whose name begin with add_ and del_ guarantee to leave the
         graph object in a consistent state, and/or the graph is a dag, provided
         that the object was in a consistent state, and/or the graph was a dag
@@ -30,6 +63,14 @@ class DAG(object):
         self._nodes = {}
         self._in = {}
         self._out = {}
+        self._ord = {} if incremental else None
+        self._next_ord = 0
+        self._reach = None
+
+    @property
+    def incremental(self):
+        """ True if add_edge() rejects edges closing cycles of any length. """
+        return not self._ord is None
 
     def print_debug(self, fd = sys.stdout):
         """ Print internal data to file. """
@@ -42,6 +83,10 @@ class DAG(object):
         self._nodes = {}
         self._in = {}
         self._out = {}
+        if self.incremental:
+            self._ord = {}
+        self._next_ord = 0
+        self._reach = None
 
     def get_data(self, id):
         """ Get data associated with id. """
@@ -70,6 +115,10 @@ class DAG(object):
         """ nodes that are not connected to any other node """
         return self.sources & self.sinks
 
+    def freeze(self):
+        """ Snapshot the graph into a new FrozenDAG. """
+        return FrozenDAG(self)
+
     def add_node(self, id, data = None, *, dup = 'error'):
         """
         Args:
@@ -86,9 +135,13 @@ class DAG(object):
             else:
                 dups = [ 'error', 'ignore', 'overwrite' ]
                 raise Py3DAGError("Keyword argument 'dup' must be one of {}".format(dups))
+        self._reach = None
         self._nodes[id] = data
         self._in[id]  = set()
         self._out[id] = set()
+        if self.incremental and not id in self._ord:
+            self._ord[id] = self._next_ord
+            self._next_ord += 1
 
     def del_node(self, id, noexist_ok = False):
         """ Delete node from graph.
@@ -106,9 +159,12 @@ class DAG(object):
             else:
                 return
 
+        self._reach = None
         del self._nodes[id]
         del self._in[id]
         del self._out[id]
+        if self.incremental:
+            del self._ord[id]
         for local_id, out_list in self._out.items():
             out_list.discard(id)
 
@@ -118,24 +174,90 @@ class DAG(object):
         Add edge src_id -> dst_id.
         No-op if src_id == dst_id.
 
+        In incremental mode, any edge closing a cycle is rejected, using the
+        online topological ordering algorithm of Pearce and Kelly. If the edge
+        agrees with the current order, the check is O(1). Otherwise, only the
+        nodes whose order lies between dst_id and src_id are searched and
+        reordered. With backedge_ok, an edge closing a cycle is added anyway
+        and the graph leaves incremental mode, as it has no topological order
+        anymore.
+
         Raises:
             Py3DAGError if this is a backedge.
+            Py3DAGCycleError if the edge closes a cycle, in incremental mode.
         """
         if src_id == dst_id:
             return
-        if not exist_ok and dst_id in self._out[src_id]:
-            raise Py3DAGError("Edge '{}' -> '{}' already exists.".format(src_id, dst_id))
-        if not backedge_ok and src_id in self._out[dst_id]:
+        if dst_id in self._out[src_id]:
+            if not exist_ok:
+                raise Py3DAGError("Edge '{}' -> '{}' already exists.".format(src_id, dst_id))
+            return
+        if self.incremental:
+            cycle = self._reorder(src_id, dst_id)
+            if cycle:
+                if not backedge_ok:
+                    raise Py3DAGCycleError(cycle)
+                self._ord = None
+        elif not backedge_ok and src_id in self._out[dst_id]:
             raise Py3DAGError("Cannot add backedge '{}' -> '{}'.".format(src_id, dst_id))
+        self._reach = None
         self._in[dst_id].add(src_id)
         self._out[src_id].add(dst_id)
 
+    def _reorder(self, src_id, dst_id):
+        """ Update _ord for a new edge src_id -> dst_id, Pearce-Kelly.
+
+        Returns:
+            None if the edge can be added, _ord is then updated. Otherwise,
+            the cycle closed by the edge, [ src_id, dst_id, ... ], and _ord is
+            left untouched.
+        """
+        lower, upper = self._ord[src_id], self._ord[dst_id]
+        if lower < upper:
+            return None
+
+        # Forward from dst_id, through nodes ordered before src_id. Reaching
+        # src_id means a path dst_id -> ... -> src_id.
+        forward = { dst_id: None }
+        stack = [ dst_id ]
+        while stack:
+            curr = stack.pop()
+            for child in self._out[curr]:
+                if child == src_id:
+                    path = [ curr ]
+                    while forward[path[-1]] is not None:
+                        path.append(forward[path[-1]])
+                    return [ src_id ] + path[::-1]
+                if not child in forward and self._ord[child] < lower:
+                    forward[child] = curr
+                    stack.append(child)
+
+        # Backward from src_id, through nodes ordered after dst_id.
+        backward = { src_id }
+        stack = [ src_id ]
+        while stack:
+            curr = stack.pop()
+            for parent in self._in[curr]:
+                if not parent in backward and self._ord[parent] > upper:
+                    backward.add(parent)
+                    stack.append(parent)
+
+        # Move the backward nodes before the forward nodes, reusing their
+        # orders and keeping the relative order within each group.
+        key = self._ord.__getitem__
+        nodes = sorted(backward, key = key) + sorted(forward, key = key)
+        orders = sorted(self._ord[id] for id in nodes)
+        for id, order in zip(nodes, orders):
+            self._ord[id] = order
+        return None
+
     def add_edges(self, src_ids, dst_ids, **kwargs):
         for src in src_ids:
             for dst in dst_ids:
                 self.add_edge(src, dst, **kwargs)
 
     def del_edge(self, src_id, dst_id, noexist_ok = False):
+        self._reach = None
         if noexist_ok:
             self._in[dst_id].discard(src_id)
             self._out[src_id].discard(dst_id)
@@ -148,43 +270,283 @@ class DAG(object):
             for dst in dst_ids:
                 self.del_edge(src, dst, **kwargs)
 
-    def check_acyclic(self):
+    def check_acyclic(self, *, raise_error = False):
         """
         return:
             None if the graph is acyclic, or
-            a tuple of node ids (u, v) upon discovery of the first backedge.
+            a tuple of node ids (u, v), an edge u -> v on a cycle.
+
+        Unlike a depth first traversal from the sources, this also finds
+        cycles that cannot be reached from any source. See levels().
+
+        Args:
+            raise_error: Raise Py3DAGCycleError, listing the whole cycle,
+                instead of returning an edge.
+        """
+        try:
+            self.levels()
+        except Py3DAGCycleError as e:
+            if raise_error:
+                raise
+            return (e.cycle[-1], e.cycle[0])
+        return None
 
-        Algorithm: Depth first traversal of graph, look for backedge.
+    def topological_order(self):
+        """ List node ids such that every node comes after all nodes it
+        depends on, i.e., prerequisites first, sinks first of all.
+
+        Raises:
+            Py3DAGCycleError: The graph has a cycle.
+        """
+        return [ id for level in self.levels() for id in level ]
 
-        vflags: visitation flags of nodes.
-            white = untouched
-            grey  = pushed stack
-            black = visited
+    def levels(self):
+        """ Partition the nodes into levels of nodes that do not depend on
+        each other.
 
-        sources: nodes with no incoming edges.
+        Level 0 holds the sinks, level k the nodes whose longest chain of
+        prerequisites has k edges. All prerequisites of a node are in lower
+        levels, so the nodes of a level can run concurrently once the lower
+        levels are done. Within a level, nodes are in the order they were
+        added.
+
+        Algorithm: Kahn's algorithm, linear in the number of nodes and edges,
+        the level of a node is one above the highest level of its
+        prerequisites. Nodes left over have at least one prerequisite left over, following
+        those leads to a cycle.
+
+        Raises:
+            Py3DAGCycleError: The graph has a cycle, its path is in the
+                exception.
         """
-        vflags = {}
+        num_pending = { id: len(out_list) for id, out_list in self._out.items() }
+        depth = dict.fromkeys(self._nodes, 0)
+        queue = [ id for id in self._nodes if num_pending[id] == 0 ]
+        for id in queue:
+            for parent in self._in[id]:
+                depth[parent] = max(depth[parent], depth[id] + 1)
+                num_pending[parent] -= 1
+                if num_pending[parent] == 0:
+                    queue.append(parent)
+        if len(queue) != len(self._nodes):
+            raise Py3DAGCycleError(self._find_cycle(num_pending))
+
+        levels = [ [] for i in range(max(depth.values(), default = -1) + 1) ]
         for id in self._nodes:
-            vflags[id] = 'white'
-        sources = self.sources
-        for id in sources:
-            if not id in vflags or vflags[id] == 'black':
-                continue
-            if vflags[id] == 'grey':
-                raise Py3DAGError("A source node '{}' is grey".format(id))
-            stack = [id]
-            vflags[id] = 'grey'
-            while len(stack) != 0:
-                curr = stack.pop()
-                vflags[curr] = 'black'
-                for child in self._out[curr]:
-                    if vflags[child] == 'white':
-                        stack.append(child)
-                        vflags[child] = 'grey'
-                    elif vflags[child] == 'black':
-                        continue
-                    elif vflags[child] == 'grey':
-                        return (curr, child)
+            levels[depth[id]].append(id)
+        return levels
+
+    def descendants(self, id):
+        """ Nodes reachable from @id, i.e., all prerequisites of @id, direct or
+        not. @id itself is not included.
+
+        Computed once per node and memoized as int bitsets until the graph is
+        altered, so repeated queries cost about as much as decoding the
+        result.
+
+        Raises:
+            Py3DAGCycleError: The graph has a cycle reachable from @id.
+        """
+        return self._decode(self._reach_bits([ id ], '_out'))
+
+    def ancestors(self, id):
+        """ Nodes from which @id is reachable, i.e., all depending tasks of
+        @id, direct or not. @id itself is not included. See descendants().
+        """
+        return self._decode(self._reach_bits([ id ], '_in'))
+
+    def closure(self, ids, *, ancestors = False):
+        """ Batch version of descendants() and ancestors().
+
+        Returns:
+            A set of @ids and their descendants, or their ancestors if
+            @ancestors is True.
+        """
+        ids = list(ids)
+        bits = self._reach_bits(ids, '_in' if ancestors else '_out')
+        index = self._reach[1]
+        for id in ids:
+            bits |= 1 << index[id]
+        return self._decode(bits)
+
+    def induced_subgraph(self, ids):
+        """ Create a new DAG with the nodes @ids and the edges among them.
+
+        Nodes keep their data and the order they were added in.
+        """
+        ids = set(ids)
+        graph = DAG()
+        for id, data in self._nodes.items():
+            if id in ids:
+                graph.add_node(id, data)
+        for id in graph._nodes:
+            for child in self._out[id]:
+                if child in ids:
+                    graph._in[child].add(id)
+                    graph._out[id].add(child)
+        return graph
+
+    def _reach_bits(self, ids, direction):
+        """ Union of the memoized bitsets of @ids, following the edges in
+        self.<direction>, computing the missing ones by depth first traversal.
+        """
+        if self._reach is None:
+            ids_list = list(self._nodes)
+            index = { id: i for i, id in enumerate(ids_list) }
+            self._reach = (ids_list, index, { '_out': {}, '_in': {} })
+        index, memo = self._reach[1], self._reach[2][direction]
+        edges = getattr(self, direction)
+
+        bits = 0
+        for root in ids:
+            if not root in memo:
+                stack = [ (root, iter(edges[root])) ]
+                on_stack = { root }
+                while stack:
+                    curr, children = stack[-1]
+                    for child in children:
+                        if child in memo:
+                            continue
+                        if child in on_stack:
+                            self.check_acyclic(raise_error = True)
+                        on_stack.add(child)
+                        stack.append((child, iter(edges[child])))
+                        break
                     else:
-                        raise Py3DAGError("Unknown vflag '{}'. Can only be 'white', 'grey', or 'black'")
-        return None
+                        stack.pop()
+                        on_stack.discard(curr)
+                        curr_bits = 0
+                        for child in edges[curr]:
+                            curr_bits |= memo[child] | (1 << index[child])
+                        memo[curr] = curr_bits
+            bits |= memo[root]
+        return bits
+
+    def _decode(self, bits):
+        """ Set of node ids of the bits set in @bits. """
+        # Least significant bit first, as bytes 0 and 1 to select ids.
+        selectors = bin(bits)[:1:-1].encode().translate(_BIN_DIGITS)
+        return set(itertools.compress(self._reach[0], selectors))
+
+    def _find_cycle(self, num_pending):
+        """ Walk from a left over node of levels() to a cycle. """
+        pending = { id for id, num in num_pending.items() if num > 0 }
+        curr = next(id for id in self._nodes if id in pending)
+        path = []
+        pos = {}
+        while not curr in pos:
+            pos[curr] = len(path)
+            path.append(curr)
+            curr = next(child for child in self._out[curr] if child in pending)
+        return path[pos[curr]:]
+
+def _csr(edges, ids, index):
+    """Compressed sparse row arrays (ptr, idx) of an adjacency dictionary.
+
+    The neighbors of the node of index i are idx[ptr[i]:ptr[i + 1]], sorted.
+    """
+    ptr = array.array('l', [ 0 ])
+    idx = array.array('l')
+    for id in ids:
+        idx.extend(sorted(index[neighbor] for neighbor in edges[id]))
+        ptr.append(len(idx))
+    return ptr, idx
+
+class FrozenDAG(object):
+    """Immutable, array-backed snapshot of a DAG.
+
+    Node ids are interned: each id is mapped to its index, an int in
+    range(len(graph)), in the order the nodes were added to the DAG. Edges are
+    stored in compressed sparse row (CSR) form, two flat arrays of indices per
+    direction, instead of a set per node. That takes a few bytes per edge and
+    copying the graph is a matter of copying four arrays. Since a FrozenDAG
+    cannot be altered, copy.copy() and copy.deepcopy() return the object
+    itself.
+
+    The arrays support the buffer protocol, e.g., numpy.frombuffer() can view
+    them without copying.
+
+    Attributes:
+        _ids: List of node ids, indexed by node index.
+        _index: Dictionary mapping node ids to their indices.
+        _data: List of data associated with nodes, indexed by node index.
+        _in_ptr, _in_idx: Incoming edges, the nodes depending on the node of
+            index i are _in_idx[_in_ptr[i]:_in_ptr[i + 1]].
+        _out_ptr, _out_idx: Outgoing edges, likewise.
+    """
+
+    def __init__(self, graph):
+        """
+        Args:
+            graph: A DAG object, read in one pass.
+        """
+        self._ids = list(graph._nodes)
+        self._index = { id: index for index, id in enumerate(self._ids) }
+        self._data = [ graph._nodes[id] for id in self._ids ]
+        self._in_ptr, self._in_idx = _csr(graph._in, self._ids, self._index)
+        self._out_ptr, self._out_idx = _csr(graph._out, self._ids, self._index)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, id):
+        return id in self._index
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def freeze(self):
+        """ Already frozen, return self. """
+        return self
+
+    def thaw(self):
+        """ Create a new mutable DAG with the same nodes and edges. """
+        graph = DAG()
+        for id, data in zip(self._ids, self._data):
+            graph.add_node(id, data)
+        for index, id in enumerate(self._ids):
+            for child in self.out_indices(index):
+                graph.add_edge(id, self._ids[child], backedge_ok = True)
+        return graph
+
+    @property
+    def ids(self):
+        """ Node ids, in index order, readonly. """
+        return self._ids
+
+    def index(self, id):
+        """ Get the index of a node id. """
+        return self._index[id]
+
+    def get_data(self, id):
+        """ Get data associated with id. """
+        return self._data[self._index[id]]
+
+    def in_indices(self, index):
+        """ Indices of the nodes with an edge to the node of @index. """
+        return self._in_idx[self._in_ptr[index]:self._in_ptr[index + 1]]
+
+    def out_indices(self, index):
+        """ Indices of the nodes with an edge from the node of @index. """
+        return self._out_idx[self._out_ptr[index]:self._out_ptr[index + 1]]
+
+    def in_degree(self, index):
+        return self._in_ptr[index + 1] - self._in_ptr[index]
+
+    def out_degree(self, index):
+        return self._out_ptr[index + 1] - self._out_ptr[index]
+
+    @property
+    def sources(self):
+        """ source: a node which has no incoming edges """
+        return [ id for index, id in enumerate(self._ids)
+                if self.in_degree(index) == 0 ]
+
+    @property
+    def sinks(self):
+        """ sink: a node which has no outgoing edges """
+        return [ id for index, id in enumerate(self._ids)
+                if self.out_degree(index) == 0 ]
@@ -1,8 +1,14 @@
+from . import cache
 from . import case
+from . import name
 
+import ast
+import concurrent.futures
 import fnmatch
-import glob
+import hashlib
+import importlib.util
 import inspect
+import keyword
 import os
 import re
 import sys
@@ -10,11 +16,226 @@ import sys
 class DiscoverError(Exception):
     pass
 
+# Discover.prescan() parses files in a process pool if there are at least this
+# many files, unless told otherwise.
+_PRESCAN_POOL_MIN_FILES = 256
+
+# Names of directories Discover.walk() does not enter unless told otherwise:
+# version control, virtual environments, caches and packaging outputs.
+DEFAULT_EXCLUDES = (
+    '.git', '.hg', '.svn', '.bzr',
+    '.venv', 'venv', '.tox', '.nox',
+    '__pycache__', '.mypy_cache', '.pytest_cache',
+    'node_modules', '*.egg-info', '.eggs',
+)
+
+# A directory holding this file is a virtual environment.
+_VENV_MARKER = 'pyvenv.cfg'
+
+# { realpath : module }, the files Discover.load_module() executed.
+_modules = {}
+
+def _glob_to_regex(pattern):
+    """Translate a .gitignore glob to a regex, where only '**' matches '/'."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            out.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            out.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            out.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            chars = pattern[i + 1:end]
+            if chars.startswith('!'):
+                chars = '^' + chars[1:]
+            out.append('[' + chars.replace('\\', '\\\\') + ']')
+            i = end + 1
+        elif pattern[i] == '\\' and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return '(?s:' + ''.join(out) + r')\Z'
+
+def _read_gitignore(fname):
+    """Parse a .gitignore file.
+
+    Returns:
+        A list of (regex, anchored, dir_only, negate) rules, in file order.
+        An anchored rule matches paths relative to the directory of the file,
+        others match base names.
+    """
+    rules = []
+    try:
+        with open(fname, 'r', encoding = 'utf8', errors = 'replace') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return rules
+    for line in lines:
+        if not line.endswith('\\ '):
+            line = line.rstrip(' ')
+        if not line or line.startswith('#'):
+            continue
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\#') or line.startswith('\\!'):
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        anchored = '/' in line
+        rules.append((re.compile(_glob_to_regex(line.lstrip('/'))), anchored,
+            dir_only, negate))
+    return rules
+
+def _scan_file(fname, baseclasses = ()):
+    """Parse a python file, without importing it, for Discover.prescan().
+
+    Returns:
+        A list of (class_name, base_names, toplevel, deps) tuples, one for each
+        class defined in the file, nested classes included. base_names are the
+        last components of the names of the bases, after resolving aliases
+        made at the top level of the file, e.g., 'from m import Base as B' or
+        'B = m.Base'. toplevel is True for classes defined at the top level of
+        the file. deps is the list of strings assigned to deps by the only
+        statement of the class body storing to it, 'deps = [ ... ]', or
+        inherited from the only base class when that class is defined in the
+        file too, or [] when that class is one of @baseclasses, None if
+        unknown without importing the file, e.g., for 'deps += [ ... ]'.
+        None if the file cannot be read or parsed.
+
+    Args:
+        baseclasses: A list of names of test case base classes, see
+            Discover.load_file(). They are assumed to have no deps.
+    """
+    try:
+        with open(fname, 'rb') as f:
+            source = f.read()
+        # Most files without tests have no class at all, skip parsing them.
+        if not b'class' in source:
+            return []
+        tree = ast.parse(source, fname)
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+    def last_name(node):
+        if isinstance(node, ast.Name):
+            return node.id
+        if isinstance(node, ast.Attribute):
+            return node.attr
+        return None
+
+    aliases = {}
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                if alias.asname:
+                    aliases[alias.asname] = alias.name
+        elif isinstance(node, ast.Assign) and last_name(node.value):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    aliases[target.id] = last_name(node.value)
+
+    def resolve(name):
+        # Follow chains of aliases, at most once through each alias.
+        for i in range(len(aliases)):
+            if not name in aliases:
+                break
+            name = aliases[name]
+        return name
+
+    def deps_stores(cls_node):
+        # Nodes of the class body storing to or deleting deps, not looking
+        # into the scopes of nested functions and classes.
+        stack = list(cls_node.body)
+        while stack:
+            node = stack.pop()
+            if isinstance(node, ast.Name) and node.id == 'deps':
+                if not isinstance(node.ctx, ast.Load):
+                    yield node
+            elif not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef,
+                    ast.ClassDef, ast.Lambda)):
+                stack.extend(ast.iter_child_nodes(node))
+
+    def literal_deps(cls_node):
+        # The deps assigned by the one plain 'deps = [ ... ]' statement of the
+        # class body, None if deps is stored in any other way.
+        for stmt in cls_node.body:
+            if (isinstance(stmt, ast.Assign) and len(stmt.targets) == 1
+                    and isinstance(stmt.targets[0], ast.Name)
+                    and stmt.targets[0].id == 'deps'):
+                try:
+                    deps = ast.literal_eval(stmt.value)
+                except ValueError:
+                    return None
+                if (isinstance(deps, (list, tuple))
+                        and all(isinstance(dep, str) for dep in deps)):
+                    return deps
+        return None
+
+    # { class_name : deps }, [] = not assigned in the class body.
+    toplevel_deps = {}
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            stores = list(deps_stores(node))
+            if not stores:
+                toplevel_deps[node.name] = []
+            elif len(stores) == 1:
+                toplevel_deps[node.name] = [ literal_deps(node) ]
+            else:
+                toplevel_deps[node.name] = [ None ]
+
+    baseclass_names = { baseclass.split('.')[-1] for baseclass in baseclasses }
+
+    def static_deps(node):
+        # Follow single inheritance within the file, at most once through
+        # each class, up to a test case base class.
+        for i in range(len(toplevel_deps)):
+            if toplevel_deps.get(node.name):
+                deps = toplevel_deps[node.name][0]
+                return None if deps is None else list(deps)
+            if len(node.bases) != 1:
+                return None
+            base_name = last_name(node.bases[0])
+            if not base_name in toplevel_nodes:
+                return [] if resolve(base_name) in baseclass_names else None
+            node = toplevel_nodes[base_name]
+        return None
+
+    toplevel_nodes = { node.name: node for node in tree.body
+            if isinstance(node, ast.ClassDef) }
+    classes = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            base_names = []
+            for base in node.bases:
+                base_name = last_name(base)
+                if base_name:
+                    base_names.append(resolve(base_name))
+            toplevel = toplevel_nodes.get(node.name) is node
+            classes.append((node.name, base_names, toplevel,
+                static_deps(node) if toplevel else None))
+    return classes
+
 class Discover:
 
     @staticmethod
     def discover(start_dir, *, baseclasses = [ case.TestCase.__name__ ],
-            recursive = True, pattern = '*.py'):
+            recursive = True, pattern = '*.py', prescan = False,
+            processes = None, cache = None, lazy = False, exclude = None,
+            skip_venv = None, gitignore = False):
         """Discover test cases.
 
         Scan @start_dir directory recursively for files whose name match
@@ -54,6 +275,26 @@ class Discover:
                 subclasses of at least one class in this list are loaded.
             recursive: True:  Recursively scan all subdirectories of @start_dir.
                 False: Only scan files in @start_dir.
+            pattern, exclude, skip_venv, gitignore: Which files to scan, see
+                walk().
+            prescan: True: Only import files that may define test cases, see
+                prescan(). False: Import all files matching @pattern.
+            processes: See prescan().
+            cache: A cache.DiscoverCache object. Files that are cached and did
+                not change are neither prescanned nor imported, their test
+                cases are cache.TestCaseInfo objects instead of classes. Other
+                files are loaded and cached, the cache is saved if it has a
+                file name.
+            lazy: True: Parse the files like prescan() does, and do not import
+                them. Test cases are the classes defined at the top level of
+                the files that derive from @baseclasses, given as
+                cache.TestCaseInfo objects, with the deps found in the class
+                bodies. A file is imported only when one of its test cases is
+                instantiated, e.g., by a Runner, or when something else is
+                needed, e.g., deps not given as a literal list of strings.
+                Unlike with load_file(), test cases a file only imports from
+                other files are not found. Files that cannot be parsed are
+                imported. False: Import the files.
 
         Raises:
             DiscoverError: start_dir is not a directory.
@@ -61,20 +302,293 @@ class Discover:
         if not os.path.isdir(start_dir):
             raise DiscoverError('start_dir {} is not a directory'.format(start_dir))
 
+        file_list = list(Discover.walk(start_dir, pattern = pattern,
+            recursive = recursive, exclude = exclude, skip_venv = skip_venv,
+            gitignore = gitignore))
+
+        # { fname : testcases } of the files that are not imported now.
+        cached = {}
+        if not cache is None:
+            for fname in file_list:
+                testcases = cache.lookup(fname, baseclasses)
+                if not testcases is None:
+                    cached[fname] = testcases
+        if lazy:
+            fnames = [ fname for fname in file_list if not fname in cached ]
+            scanned = Discover._scan(fnames, processes, baseclasses)
+            found = Discover._testcase_classes(scanned, baseclasses)
+            for fname, classes, indices in zip(fnames, scanned, found):
+                if not classes is None:
+                    cached[fname] = Discover._lazy_testcases(fname, classes,
+                            indices, baseclasses)
+        elif prescan:
+            selected = set(Discover.prescan(
+                    [ fname for fname in file_list if not fname in cached ],
+                    baseclasses = baseclasses, processes = processes))
+            for fname in file_list:
+                if not fname in cached and not fname in selected:
+                    # No test case, remember that too.
+                    cached[fname] = []
+                    if not cache is None:
+                        cache.store(fname, baseclasses, [])
+
         testcases = []
+        for fname in file_list:
+            if fname in cached:
+                testcases += cached[fname]
+                continue
+            loaded = Discover.load_file(fname, baseclasses = baseclasses)
+            if not cache is None:
+                cache.store(fname, baseclasses, loaded)
+            testcases += loaded
+        if not cache is None and cache.dirty and cache.fname:
+            cache.save()
+        return testcases
+
+    @staticmethod
+    def walk(start_dir, *, pattern = '*.py', recursive = True, exclude = None,
+            skip_venv = None, gitignore = False):
+        """Find the files to discover test cases in.
+
+        Directories are listed with os.scandir(), and excluded directories are
+        not entered at all. Symbolic links to directories are not followed.
+
+        Yields:
+            The paths of the files, relative to the working directory if
+            @recursive. Otherwise, @start_dir joined with the file names. The
+            files of a directory come before those of its subdirectories.
+
+        Args:
+            pattern: A glob pattern, or a list of them, matched against the
+                names of the files.
+            recursive: True: Scan subdirectories too. False: Only scan
+                @start_dir.
+            exclude: A list of glob patterns of files and directories to skip.
+                Patterns with a '/' are matched against paths relative to
+                @start_dir, others against names. None = DEFAULT_EXCLUDES.
+            skip_venv: True: Skip directories holding a pyvenv.cfg file, i.e.,
+                virtual environments. None = only if @exclude is None.
+            gitignore: True: Also skip what .gitignore files in @start_dir and
+                in its subdirectories ignore. Patterns, '**', negation with '!'
+                and trailing '/' are supported like git does, but .gitignore
+                files above @start_dir and other exclude files of git are not
+                read.
+        """
+        patterns = [ pattern ] if isinstance(pattern, str) else list(pattern)
+        include = re.compile('|'.join(fnmatch.translate(p) for p in patterns))
+        if skip_venv is None:
+            skip_venv = exclude is None
+        if exclude is None:
+            exclude = DEFAULT_EXCLUDES
+        exclude_name = exclude_path = None
+        name_patterns = [ p for p in exclude if not '/' in p ]
+        path_patterns = [ p.strip('/') for p in exclude if '/' in p ]
+        if name_patterns:
+            exclude_name = re.compile('|'.join(fnmatch.translate(p)
+                for p in name_patterns))
+        if path_patterns:
+            exclude_path = re.compile('|'.join(fnmatch.translate(p)
+                for p in path_patterns))
+
         if recursive:
-            reg_pattern = fnmatch.translate(pattern)
-            for root, dirs, files in os.walk(start_dir):
-                for fname in [ f for f in files if re.match(reg_pattern, f) ]:
-                    fullpath = os.path.join(root, fname)
-                    relpath = os.path.relpath(fullpath)
-                    testcases += Discover.load_file(relpath,
-                            baseclasses = baseclasses)
+            prefix = os.path.relpath(start_dir)
+            if prefix == os.curdir:
+                prefix = ''
         else:
-            file_list = glob.glob(start_dir + '/' + pattern)
-            for fname in file_list:
-                testcases += Discover.load_file(fname, baseclasses = baseclasses)
-        return testcases
+            prefix = start_dir
+
+        def ignored(relpath, name, is_dir, rules):
+            # Rules are (rule, base) tuples, base is the path of the directory
+            # of the .gitignore file relative to @start_dir. The last matching
+            # rule wins.
+            for (regex, anchored, dir_only, negate), base in reversed(rules):
+                if dir_only and not is_dir:
+                    continue
+                if anchored:
+                    if base and not relpath.startswith(base + '/'):
+                        continue
+                    subject = relpath[len(base) + 1:] if base else relpath
+                else:
+                    subject = name
+                if regex.match(subject):
+                    return not negate
+            return False
+
+        # (path relative to start_dir, gitignore rules), directories are
+        # visited depth first, in the order they are listed.
+        stack = [ ('', []) ]
+        while stack:
+            reldir, rules = stack.pop()
+            try:
+                with os.scandir(os.path.join(start_dir, reldir)) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            if reldir and skip_venv and any(entry.name == _VENV_MARKER
+                    for entry in entries):
+                continue
+            if gitignore:
+                for entry in entries:
+                    if entry.name == '.gitignore' and entry.is_file():
+                        rules = rules + [ (rule, reldir) for rule in
+                            _read_gitignore(entry.path) ]
+                        break
+            subdirs = []
+            for entry in entries:
+                name = entry.name
+                relpath = reldir + '/' + name if reldir else name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                if exclude_name and exclude_name.match(name):
+                    continue
+                if exclude_path and exclude_path.match(relpath):
+                    continue
+                if rules and ignored(relpath, name, is_dir, rules):
+                    continue
+                if is_dir:
+                    if recursive and not entry.is_symlink():
+                        subdirs.append((relpath, rules))
+                elif include.match(name):
+                    if recursive:
+                        yield os.path.join(prefix, relpath)
+                    else:
+                        yield prefix + '/' + name
+            stack.extend(reversed(subdirs))
+
+    @staticmethod
+    def prescan(fnames, *, baseclasses = [ case.TestCase.__name__ ],
+            processes = None):
+        """Select the files that may define test cases, without importing them.
+
+        Files are parsed with the ast module. Class names are collected across
+        all files, and a class is taken as a test case if one of its bases is
+        named after one of @baseclasses or, transitively, after such a class.
+        Only the last components of names are compared, e.g., both
+        'pitest.TestCase' and 'TestCase' are named 'TestCase'. So a file may be
+        selected that defines no test case, but a file defining test cases is
+        not missed, unless a base class is computed at run time, e.g., by a
+        function call. Use discover() without prescan in that case.
+
+        Unlike importing every file, a file that only imports test cases from
+        other files is not selected.
+
+        Files that cannot be parsed are selected, so that importing them
+        reports the error.
+
+        Returns:
+            The selected file names, in the same order as in @fnames.
+
+        Args:
+            fnames: A list of file names.
+            baseclasses: A list of names of test case base classes, see
+                load_file().
+            processes: Number of processes parsing files. None = a process per
+                CPU if there are many files, 1 = parse in this process.
+        """
+        fnames = list(fnames)
+        scanned = Discover._scan(fnames, processes)
+        found = Discover._testcase_classes(scanned, baseclasses)
+        return [ fname for fname, classes, indices
+                in zip(fnames, scanned, found) if classes is None or indices ]
+
+    @staticmethod
+    def _scan(fnames, processes, baseclasses = ()):
+        """_scan_file() each file, see prescan() for @processes."""
+        baseclasses = tuple(baseclasses)
+        if processes is None and len(fnames) < _PRESCAN_POOL_MIN_FILES:
+            processes = 1
+        if processes == 1:
+            return [ _scan_file(fname, baseclasses) for fname in fnames ]
+        processes = processes or os.cpu_count() or 1
+        chunksize = max(1, len(fnames) // (4 * processes))
+        with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+            return list(executor.map(_scan_file, fnames,
+                [ baseclasses ] * len(fnames), chunksize = chunksize))
+
+    @staticmethod
+    def _testcase_classes(scanned, baseclasses):
+        """The scanned classes derived from @baseclasses.
+
+        A base name refers to the class of that name defined before at the top
+        level of the same file, if any. Otherwise, it refers to @baseclasses
+        and to the classes of that name in any file, as classes imported from
+        other files are only known by name.
+
+        The fixpoint is reached by a traversal from @baseclasses to the classes
+        derived from them.
+
+        Returns:
+            A list of sets, one for each scanned file, of the indices of the
+            test case classes in the list of classes of the file.
+        """
+        # { base_name : [ (file index, class index) ] }, where the base name
+        # refers to any class of that name, and one such dictionary per file
+        # where it refers to a top-level class of the file.
+        derived = {}
+        local_derived = []
+        for i, classes in enumerate(scanned):
+            toplevel_index = { cls[0]: j for j, cls in enumerate(classes or [])
+                    if cls[2] }
+            local = {}
+            for j, (cls_name, base_names, toplevel, deps) in enumerate(
+                    classes or []):
+                for base_name in base_names:
+                    if toplevel_index.get(base_name, j) < j:
+                        local.setdefault(base_name, []).append((i, j))
+                    else:
+                        derived.setdefault(base_name, []).append((i, j))
+            local_derived.append(local)
+
+        # (file index, name) of the classes found so far, None = any file.
+        baseclass_names = { baseclass.split('.')[-1] for baseclass in baseclasses }
+        stack = [ (None, base_name) for base_name in baseclass_names ]
+        stack += [ (i, cls_name) for i, classes in enumerate(scanned)
+                for cls_name, base_names, toplevel, deps in classes or []
+                if toplevel and cls_name in baseclass_names ]
+        seen = set(stack)
+        retval = [ set() for classes in scanned ]
+        while stack:
+            i, base_name = stack.pop()
+            for k, j in (derived if i is None else local_derived[i]).get(
+                    base_name, []):
+                if j in retval[k]:
+                    continue
+                retval[k].add(j)
+                cls_name, base_names, toplevel, deps = scanned[k][j]
+                found = [ (None, cls_name) ] + ([ (k, cls_name) ]
+                        if toplevel else [])
+                for item in found:
+                    if not item in seen:
+                        seen.add(item)
+                        stack.append(item)
+        return retval
+
+    @staticmethod
+    def _lazy_testcases(fname, classes, indices, baseclasses):
+        """Test cases of a scanned file, see discover() with lazy = True.
+
+        Args:
+            indices: The indices of the test case classes in @classes, see
+                _testcase_classes().
+
+        Returns:
+            A list of (full_cls_name, cache.TestCaseInfo) tuples, ordered by
+            class name like load_file() does.
+        """
+        prefix = Discover._convert_path(fname)
+        retval = []
+        for cls_name, base_names, toplevel, deps in sorted((classes[j]
+                for j in indices), key = lambda cls: cls[0]):
+            if toplevel:
+                full_cls_name = '{}.{}'.format(prefix, cls_name)
+                entry = { 'name': cls_name }
+                if not deps is None:
+                    entry['deps'] = deps
+                retval.append((full_cls_name, cache.TestCaseInfo(fname,
+                    full_cls_name, entry, baseclasses, lazy = True)))
+        return retval
 
 
     @staticmethod
@@ -94,27 +608,138 @@ class Discover:
                 subclasses of at least one class in this list are loaded.
         """
 
-        realpath    = os.path.realpath(fname)
-        dirname     = os.path.dirname(realpath)
-        basename    = os.path.basename(realpath)
-        module_name = os.path.splitext(basename)[0]
-
-        sys.path.append(dirname)
-        module = __import__(module_name, globals())
-        sys.path.pop()
+        module = Discover.load_module(fname)
+        prefix = Discover._convert_path(fname)
+        regex = name.PyName.re_compile(tuple(baseclasses))
 
-        classes_map = inspect.getmembers(module, inspect.isclass)
+        # { super_cls : bool }, whether the name of a class matches, and the
+        # classes that do, to check whole MROs at once with issubclass().
+        matches = {}
+        matched = ()
         classes = []
-        for cls_name, cls in classes_map:
-            for super_cls in inspect.getmro(cls)[1:]:
-                full_super_cls_name = Discover._convert_path(fname) + '.' + super_cls.__name__
-                if Discover._match_full_class_name(full_super_cls_name, baseclasses):
-                    full_cls_name = Discover._convert_path(fname) + '.' + cls_name
-                    cls_tuple = (full_cls_name, cls)
-                    classes.append(cls_tuple)
+        for cls_name, cls in inspect.getmembers(module, inspect.isclass):
+            if matched and issubclass(cls, matched) and not cls in matches:
+                classes.append(('{}.{}'.format(prefix, cls_name), cls))
+                continue
+            for super_cls in cls.__mro__[1:]:
+                if not super_cls in matches:
+                    matches[super_cls] = not regex.match('{}.{}'.format(prefix,
+                        super_cls.__name__)) is None
+                    if matches[super_cls]:
+                        matched += (super_cls, )
+                if matches[super_cls]:
+                    # Once, even if several base classes match.
+                    classes.append(('{}.{}'.format(prefix, cls_name), cls))
+                    break
 
         return classes
 
+    @staticmethod
+    def load_module(fname):
+        """Execute a python file as a module, once per process.
+
+        The module is named after the path of the file, see _module_name(),
+        so files with the same base name in different directories are
+        distinct modules. It is also registered under its base name, e.g.,
+        'foo' for 'some/dir/foo.py', unless importing that name would find
+        another module, e.g., 'queue' of the standard library, so that files
+        importing it by that name get the same module instead of executing
+        the file again. The directory of the file is appended to sys.path
+        while it is executed. Bytecode is cached like for any imported module.
+
+        Returns:
+            The module. Files already loaded, resolving symbolic links, are not
+            executed again. Neither are files already imported under their
+            base name.
+
+        Raises:
+            Whatever executing the file raises. The module is not registered
+            then.
+        """
+        realpath = os.path.realpath(fname)
+        module = _modules.get(realpath)
+        if not module is None:
+            return module
+
+        dirname = os.path.dirname(realpath)
+        basename = os.path.splitext(os.path.basename(realpath))[0]
+        imported = sys.modules.get(basename)
+        if (not imported is None and getattr(imported, '__file__', None)
+                and os.path.realpath(imported.__file__) == realpath):
+            _modules[realpath] = imported
+            return imported
+
+        module_name = Discover._module_name(fname, realpath)
+        spec = importlib.util.spec_from_file_location(module_name, realpath)
+        module = importlib.util.module_from_spec(spec)
+        alias = (not basename in sys.modules and basename.isidentifier()
+                and Discover._finds_file(basename, realpath))
+        sys.modules[module_name] = module
+        if alias:
+            sys.modules[basename] = module
+        sys.path.append(dirname)
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[module_name]
+            if alias and sys.modules.get(basename) is module:
+                del sys.modules[basename]
+            raise
+        finally:
+            # Only the entry appended above, not one the user had already.
+            if sys.path and sys.path[-1] == dirname:
+                sys.path.pop()
+        _modules[realpath] = module
+        return module
+
+    @staticmethod
+    def _finds_file(module_name, realpath):
+        """Would importing @module_name find nothing, or @realpath, the file
+        of a module or the directory of a package."""
+        try:
+            spec = importlib.util.find_spec(module_name)
+        except (ImportError, ValueError):
+            return False
+        if spec is None:
+            return True
+        paths = list(spec.submodule_search_locations or [])
+        if not spec.origin is None:
+            paths.append(spec.origin)
+        return any(os.path.realpath(path) == realpath for path in paths)
+
+    @staticmethod
+    def _module_name(fname, realpath):
+        """A module name for a file, not in sys.modules yet.
+
+        The python style name of @fname, see PyName.to_pyname(), with
+        characters and components not allowed in module names replaced, e.g.,
+        'test_dir.foo' for 'test_dir/foo.py'. If the file name cannot be
+        converted, or the name is taken by another module, or its top-level
+        component would import something else than the file or its top
+        directory, e.g., 'fractions' of the standard library for
+        'fractions.py', a digest of @realpath is appended to its base name.
+        """
+        try:
+            components = name.PyName.to_pyname(fname).split('.')
+        except name.PyNameError:
+            components = []
+        components = [ re.sub(r'\W', '_', component) for component in components
+                if component ]
+        components = [ '_' + component if component[0].isdigit()
+                or keyword.iskeyword(component) else component
+                for component in components ]
+        module_name = '.'.join(components)
+        top_path = realpath
+        for component in components[1:]:
+            top_path = os.path.dirname(top_path)
+        if (not module_name or module_name in sys.modules
+                or not Discover._finds_file(components[0], top_path)):
+            basename = re.sub(r'\W', '_',
+                    os.path.splitext(os.path.basename(realpath))[0])
+            module_name = '_pitest_{}_{}'.format(basename,
+                    hashlib.sha1(realpath.encode('utf8')).hexdigest()[:12])
+        return module_name
+
     @staticmethod
     def _match_full_class_name(full_cls_name, baseclasses):
         """Check if a full class name matches any in a given list.
@@ -137,11 +762,8 @@ class Discover:
             full_cls_name: The class object to test.
             baseclasses: A list of names of base classes.
         """
-        for baseclass in baseclasses:
-            reg_pattern = '^(({0})|(.*\.{0}))$'.format(baseclass)
-            if re.match(reg_pattern, full_cls_name):
-                return True
-        return False
+        return not name.PyName.re_compile(tuple(baseclasses)).match(
+                full_cls_name) is None
 
     @staticmethod
     def _convert_path(fname):
@@ -0,0 +1,277 @@
+from . import result
+from . import runner
+from . import scheduler
+
+import os
+import pickle
+import selectors
+import socket
+import struct
+
+class DistributedError(Exception):
+    pass
+
+def _send(sock, obj):
+    """Send a pickled, length-prefixed message."""
+    data = pickle.dumps(obj)
+    sock.sendall(struct.pack('!I', len(data)) + data)
+
+def _recv(sock):
+    """Receive a message sent by _send().
+
+    Returns:
+        The unpickled message, or None if the peer closed the connection.
+    """
+    header = _recv_exactly(sock, 4)
+    if header is None:
+        return None
+    data = _recv_exactly(sock, struct.unpack('!I', header)[0])
+    if data is None:
+        return None
+    return pickle.loads(data)
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+def _socket_family(address):
+    """AF_UNIX for path strings, AF_INET for (host, port) tuples."""
+    if isinstance(address, str):
+        if not hasattr(socket, 'AF_UNIX'):
+            raise DistributedError('Unix domain sockets are not supported on this platform')
+        return socket.AF_UNIX
+    return socket.AF_INET
+
+class Coordinator(object):
+    """Run a test suite on remote worker processes.
+
+    The coordinator owns the suite-level Scheduler. Workers, see Worker,
+    connect to the coordinator and are handed full class names of test cases,
+    one at a time. They run the test cases and send back TestCaseResult
+    objects, which the coordinator delivers to, or fails in, the scheduler.
+
+    If a worker disconnects before reporting the result of a test case, the
+    test case is re-fetched with fetched_ok = True and handed to the next idle
+    worker, up to max_retries times. A test case that loses more workers than
+    that, e.g., because it crashes them, fails instead.
+
+    Protocol, all messages are pickled tuples prefixed by their length:
+        coordinator -> worker: ('hello', args_obj), ('run', full_cls_name),
+            ('exit', )
+        worker -> coordinator: ('result', full_cls_name, testcase_result)
+
+    Messages are pickles, only use this on trusted networks.
+    """
+
+    def __init__(self, suite, address, *, args_obj = None, backlog = 128,
+            max_retries = 1):
+        """
+        Args:
+            suite: An instance of a subclass of pitest.TestSuiteBase, with test
+                cases loaded.
+            address: Where to listen for workers. A (host, port) tuple for TCP,
+                port 0 picks a free port. A path string for a Unix domain
+                socket.
+            args_obj: An instance of Args, sent to workers when they connect.
+            max_retries: How many times a test case is handed to another
+                worker after its worker disconnected.
+        """
+        self._suite = suite
+        self._args_obj = args_obj
+        self._max_retries = max_retries
+        self._listener = socket.socket(_socket_family(address), socket.SOCK_STREAM)
+        if not isinstance(address, str):
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(address)
+        self._listener.listen(backlog)
+
+    @property
+    def address(self):
+        """The address workers should connect to."""
+        return self._listener.getsockname()
+
+    def close(self):
+        """Stop listening for workers."""
+        address = self.address
+        self._listener.close()
+        if isinstance(address, str) and os.path.exists(address):
+            os.unlink(address)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def run(self, *, timeout = None, priority = None):
+        """Run all test cases of the suite on the connected workers.
+
+        Returns:
+            An newly-created TestSuiteResult object, the same as
+            Runner.run_test_suite() would return.
+
+        Args:
+            timeout: Maximum number of seconds to wait for any worker to connect
+                or report a result. None = wait forever.
+            priority: Sort key of full class names of test cases, see
+                Runner.run_test_suite().
+
+        Raises:
+            DistributedError: Timed out waiting for workers.
+        """
+        res = result.TestSuiteResult(self._suite.__class__.__name__,
+                self._args_obj)
+
+        graph = self._suite.get_deps_graph()
+        sched = scheduler.Scheduler(graph, deepcopy = False, priority = priority)
+        selector = selectors.DefaultSelector()
+        selector.register(self._listener, selectors.EVENT_READ)
+        idle = []
+        assigned = {}
+        lost = set()
+        # { task_id : number of workers lost while running it }
+        num_lost = {}
+        testcase_results = {}
+
+        def drop(conn):
+            selector.unregister(conn)
+            conn.close()
+            if conn in idle:
+                idle.remove(conn)
+            if conn in assigned:
+                task_id = assigned.pop(conn)
+                num_lost[task_id] = num_lost.get(task_id, 0) + 1
+                if num_lost[task_id] <= self._max_retries:
+                    lost.add(task_id)
+                    return
+                testcase_result = result.TestCaseResult(task_id)
+                testcase_result.add_failure('worker',
+                        'lost {} workers while running the test case'.format(
+                            num_lost[task_id]))
+                testcase_results[task_id] = testcase_result
+                sched.fail_task(task_id)
+
+        try:
+            # available_tasks keeps fetched tasks until they are delivered or
+            # failed, it is empty only when no more test case can run.
+            while sched.available_tasks:
+                while idle:
+                    # Test cases of lost workers first, they were due earlier.
+                    if lost:
+                        task_id = min(lost, key = priority)
+                        lost.discard(task_id)
+                        sched.fetch_task(task_id, fetched_ok = True)
+                    else:
+                        task_id = sched.pop_next()
+                        if task_id is None:
+                            break
+                    conn = idle.pop()
+                    assigned[conn] = task_id
+                    try:
+                        _send(conn, ('run', task_id))
+                    except OSError:
+                        drop(conn)
+
+                events = selector.select(timeout)
+                if not events:
+                    raise DistributedError('Timed out after {} seconds waiting for workers'
+                            .format(timeout))
+                for key, mask in events:
+                    if key.fileobj is self._listener:
+                        conn, _ = self._listener.accept()
+                        conn.setblocking(True)
+                        selector.register(conn, selectors.EVENT_READ)
+                        try:
+                            _send(conn, ('hello', self._args_obj))
+                            idle.append(conn)
+                        except OSError:
+                            drop(conn)
+                        continue
+                    conn = key.fileobj
+                    try:
+                        msg = _recv(conn)
+                    except OSError:
+                        msg = None
+                    if msg is None:
+                        drop(conn)
+                        continue
+                    _, task_id, testcase_result = msg
+                    if assigned.pop(conn, None) != task_id:
+                        raise DistributedError("Worker reported unassigned test case '{}'"
+                                .format(task_id))
+                    testcase_results[task_id] = testcase_result
+                    if testcase_result.success:
+                        sched.deliver_task(task_id)
+                    else:
+                        sched.fail_task(task_id)
+                    idle.append(conn)
+        finally:
+            for conn in idle + list(assigned):
+                try:
+                    _send(conn, ('exit', ))
+                except OSError:
+                    pass
+                selector.unregister(conn)
+                conn.close()
+            selector.close()
+
+        succeeded = { task_id: testcase_result.success for task_id,
+                testcase_result in testcase_results.items() }
+        for task_id in runner.Runner._serial_order(graph, succeeded,
+                priority = priority):
+            res.add_test_case_result(testcase_results[task_id])
+        res.set_blocked_testcases(sched.blocked_tasks)
+        res.set_unknown_testcases(sched.unknown_tasks)
+
+        return res
+
+class Worker(object):
+    """Run test cases handed out by a Coordinator.
+
+    The worker must load the same test cases, under the same full class names,
+    as the suite of the coordinator, e.g., by discovering the same directory
+    from the same working directory.
+    """
+
+    def __init__(self, suite, address):
+        """
+        Args:
+            suite: An instance of the same subclass of pitest.TestSuiteBase as
+                the coordinator's, with test cases loaded.
+            address: The address of the coordinator, see Coordinator.address.
+        """
+        self._suite = suite
+        self._address = address
+
+    def run(self):
+        """Run test cases until the coordinator says 'exit' or goes away.
+
+        Returns:
+            The number of test cases run by this worker.
+        """
+        graph = self._suite.get_deps_graph()
+        num_testcases = 0
+        with socket.socket(_socket_family(self._address), socket.SOCK_STREAM) as sock:
+            sock.connect(self._address)
+            args_obj = None
+            while True:
+                msg = _recv(sock)
+                if msg is None or msg[0] == 'exit':
+                    break
+                if msg[0] == 'hello':
+                    args_obj = msg[1]
+                elif msg[0] == 'run':
+                    task_id = msg[1]
+                    testcase_result = runner.Runner._run_test_case_by_id(graph,
+                            task_id, args_obj)
+                    _send(sock, ('result', task_id, testcase_result))
+                    num_testcases += 1
+                else:
+                    raise DistributedError("Unknown message '{}'".format(msg[0]))
+        return num_testcases
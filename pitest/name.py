@@ -1,3 +1,5 @@
+import fnmatch
+import functools
 import os
 import re
 
@@ -44,6 +46,21 @@ class PyName(object):
         reg_pattern = '^(({0})|(.*\.{0}))$'.format(needle)
         return re.match(reg_pattern, haystack)
 
+    @staticmethod
+    @functools.lru_cache(maxsize = None)
+    def re_compile(needles):
+        """Compile needles into one regex.
+
+        Returns:
+            A compiled regex whose match() matches a haystack if re_match()
+            matches it with any of @needles.
+
+        Args:
+            needles: A tuple of needles. Compiled once per tuple.
+        """
+        return re.compile('^(?:.*\.)?(?:{})$'.format('|'.join(
+            '(?:{})'.format(needle) for needle in needles)))
+
     def match(self, name):
         """Match self.name to the given name."""
         return PyName.re_match(self.name, name)
@@ -90,3 +107,76 @@ class PyName(object):
             raise PyNameError("Path '{}' must not have dot '.' or ':'.".format(basename))
         retval = basename.replace('/', '.')
         return retval
+
+class NameIndex(object):
+    """Index of dotted full names, e.g., full class names of test cases, for
+    resolving glob patterns the way deps are resolved.
+
+    A pattern matches a name if it matches the whole name, or the end of the
+    name starting after a dot, like PyName.re_match(). Unlike re_match(), the
+    pattern is a glob, not a regular expression, e.g., dots are literal:
+        ('foo.bar.Case1', 'Case1')          => True
+        ('foo.bar.Case1', 'bar.Case*')      => True
+        ('foo.bar.Case1', 'foo.Case1')      => False
+        ('foo.bar.Case100', 'Case10')       => False
+
+    Names are stored in a trie of their components in reverse order, each
+    trie node listing all names ending with the components on its path. A
+    pattern without wildcards resolves in time proportional to its number of
+    components and matches. A pattern with wildcards is matched against the
+    names ending with its trailing literal components, if any, otherwise
+    against all names.
+
+    Attributes:
+        _names: All names, in the order they were added.
+        _trie: The root trie node, a 2-tuple (children, names) where children
+            maps a name component to a trie node and names lists all names
+            having the path of the node as components at their end.
+    """
+
+    def __init__(self, names = ()):
+        self._names = []
+        self._trie = ({}, self._names)
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name):
+        """Add a name. Adding the same name twice lists it twice."""
+        self._names.append(name)
+        node = self._trie
+        for component in reversed(name.split('.')):
+            children = node[0]
+            if not component in children:
+                children[component] = ({}, [])
+            node = children[component]
+            node[1].append(name)
+
+    def match(self, pattern):
+        """Names matched by the glob @pattern.
+
+        Returns:
+            A list of names, in the order they were added.
+        """
+        wildcard = max(pattern.rfind(c) for c in '*?[]')
+        if wildcard < 0:
+            return list(self._lookup(pattern))
+        dot = pattern.find('.', wildcard)
+        candidates = self._lookup(pattern[dot + 1:]) if dot >= 0 else self._names
+        reg = NameIndex._compile(pattern)
+        return [ name for name in candidates if reg.match(name) ]
+
+    def _lookup(self, suffix):
+        """Names ending with the components of @suffix."""
+        node = self._trie
+        for component in reversed(suffix.split('.')):
+            node = node[0].get(component)
+            if node is None:
+                return []
+        return node[1]
+
+    @staticmethod
+    def _compile(pattern):
+        return re.compile(r'(?s:.*\.)?' + fnmatch.translate(pattern))
@@ -0,0 +1,129 @@
+from . import dag
+
+import json
+import os
+
+class PriorityError(Exception):
+    pass
+
+class DurationHistory(object):
+    """Wall-clock durations of test cases recorded from previous runs.
+
+    Stored as a JSON file mapping full class names of test cases to seconds:
+        { "foo.bar.Case1": 0.25, "foo.bar.Case2": 12.5 }
+
+    Typical use:
+        history = pitest.DurationHistory('.pitest-durations.json')
+        priority = pitest.CriticalPath(suite.get_deps_graph(), history)
+        result = pitest.Runner.run_test_suite(suite, workers = 8,
+                priority = priority.key)
+        history.update(result)
+        history.save()
+    """
+
+    def __init__(self, fname = None):
+        """
+        Args:
+            fname: The JSON file to load from and save to. Loaded if it exists.
+                None = start empty and do not persist.
+
+        Raises:
+            PriorityError: The file exists but is not a valid history file.
+        """
+        self._fname = fname
+        self._durations = {}
+        if fname and os.path.exists(fname):
+            self.load()
+
+    @property
+    def durations(self):
+        """A dictionary mapping full class names to seconds, readonly."""
+        return self._durations
+
+    def get(self, name, default = None):
+        """Recorded duration of a test case, @default if unknown."""
+        return self._durations.get(name, default)
+
+    def update(self, suite_result):
+        """Record the durations of all test cases run in a TestSuiteResult.
+
+        The latest duration of a test case replaces the recorded one.
+        """
+        for testcase_result in suite_result.testcase_results:
+            if not testcase_result.duration is None:
+                self._durations[testcase_result.name] = testcase_result.duration
+
+    def load(self):
+        try:
+            with open(self._fname, 'r', encoding = 'utf8') as f:
+                durations = json.load(f)
+        except ValueError as e:
+            raise PriorityError("Cannot load duration history '{}': {}".format(
+                self._fname, e))
+        if not isinstance(durations, dict):
+            raise PriorityError("Duration history '{}' must be a JSON object"
+                    .format(self._fname))
+        self._durations = durations
+
+    def save(self):
+        if not self._fname:
+            raise PriorityError('Cannot save a duration history without file name')
+        tmp_fname = self._fname + '.tmp'
+        with open(tmp_fname, 'w', encoding = 'utf8') as f:
+            json.dump(self._durations, f, indent = 4, sort_keys = True)
+        os.replace(tmp_fname, self._fname)
+
+class CriticalPath(object):
+    """Critical-path-first priority of tasks in a dependency graph.
+
+    The priority of a task is the length of the longest path from the task to
+    any source of the graph, i.e., its longest chain of (transitively) depending
+    tasks, the task itself included. Running the task with the longest
+    remaining chain first keeps long chains from starting late and setting the
+    wall-clock time of the whole run.
+
+    The length of a path is the sum of the weights of its tasks. Weights are
+    durations recorded in a DurationHistory. Tasks without recorded duration
+    weigh the average of the recorded ones, or 1 if none is recorded, in which
+    case path lengths are just numbers of tasks.
+    """
+
+    def __init__(self, graph, history = None):
+        """
+        Args:
+            graph: A dag.DAG object, e.g., from TestSuiteBase.get_deps_graph().
+            history: A DurationHistory object. None = unit weights.
+
+        Raises:
+            PriorityError: The graph has a cycle.
+        """
+        durations = history.durations if history else {}
+        known = [ durations[id] for id in graph._nodes if id in durations ]
+        default = sum(known) / len(known) if known else 1
+        weights = { id: durations.get(id, default) for id in graph._nodes }
+
+        try:
+            order = graph.topological_order()
+        except dag.Py3DAGCycleError as e:
+            raise PriorityError('Cannot compute critical paths of a cyclic graph: {}'
+                    .format(e))
+
+        # Visit tasks after all of their depending tasks, starting from the
+        # sources of the graph.
+        self._lengths = {}
+        for id in reversed(order):
+            longest = 0
+            for parent in graph._in[id]:
+                longest = max(longest, self._lengths[parent])
+            self._lengths[id] = weights[id] + longest
+
+    def length(self, id):
+        """Length of the longest path from task @id to any source."""
+        return self._lengths[id]
+
+    def key(self, id):
+        """Sort key, the task with the longest path sorts first.
+
+        Ties are broken by task id to keep the order deterministic.
+        """
+        return (-self._lengths[id], id)
@@ -0,0 +1,160 @@
+from . import name
+
+import importlib
+import weakref
+
+class RegistryError(Exception):
+    pass
+
+# The entry point group listing test modules, see Registry.load_entry_points().
+ENTRY_POINT_GROUP = 'pitest.testmodules'
+
+# { module_name : { cls_name : cls } }, the test case classes defined so far,
+# in the order they were defined. Classes nothing else refers to, e.g., defined
+# by code executed once, are dropped.
+_testcases = {}
+
+class Registry(object):
+    """Test case classes registered when they are defined.
+
+    Every subclass of TestCase defined at the top level of a module registers
+    itself with its full name:
+
+        module_name.class_name
+
+    e.g., 'foo.bar.Case1' for class Case1 in module foo.bar. That is the full
+    name Discover.load_file() gives to the same class when the module is
+    imported by its path relative to the working directory, as foo/bar.py, so
+    deps and base classes resolve the same way. Classes nested in classes or
+    defined in functions are not registered, nor are classes setting register
+    to False in their own body, e.g., helper base classes:
+
+        class HelperBase(pitest.TestCase):
+            register = False
+
+    Loading test cases from the registry only imports the given modules. It
+    neither walks directories nor inspects every member of the modules.
+
+    Typical use:
+        suite.load_modules([ 'foo.bar', 'foo.baz' ])
+    or, with test modules listed in the 'pitest.testmodules' entry point group
+    of installed distributions, e.g., in setup.py:
+        entry_points = { 'pitest.testmodules': [ 'bar = foo.bar' ] }
+    then:
+        suite.load_entry_points()
+    """
+
+    @staticmethod
+    def register(cls):
+        """Register a test case class, called by TestCase.__init_subclass__().
+
+        Registering a class under the name of a registered class, e.g., when a
+        module is reloaded, replaces it.
+        """
+        if (cls.__qualname__ != cls.__name__
+                or not cls.__dict__.get('register', True)):
+            return
+        _testcases.setdefault(cls.__module__,
+                weakref.WeakValueDictionary())[cls.__name__] = cls
+
+    @staticmethod
+    def testcases(module_names = None, *, baseclasses = [ 'TestCase' ]):
+        """Registered test cases.
+
+        Returns:
+            A list of (full_cls_name, cls) tuples, module by module, in the
+            order the classes were defined.
+
+        Args:
+            module_names: Names of the modules whose test cases to return. None
+                = all modules.
+            baseclasses: A list of names of test case base classes. Only
+                subclasses of at least one class in this list are returned, see
+                Discover.load_file().
+        """
+        if module_names is None:
+            module_names = list(_testcases)
+        regex = name.PyName.re_compile(tuple(baseclasses))
+        matches = {}
+        retval = []
+        for module_name in module_names:
+            for cls_name, cls in list(_testcases.get(module_name, {}).items()):
+                if Registry._is_subclass(cls, regex, matches):
+                    retval.append(('{}.{}'.format(module_name, cls_name), cls))
+        return retval
+
+    @staticmethod
+    def load_modules(module_names, *, baseclasses = [ 'TestCase' ]):
+        """Import modules and return the test cases they define.
+
+        Returns:
+            A list of (full_cls_name, cls) tuples, see testcases().
+
+        Raises:
+            RegistryError: A module cannot be imported.
+        """
+        module_names = list(module_names)
+        for module_name in module_names:
+            try:
+                importlib.import_module(module_name)
+            except ImportError as e:
+                raise RegistryError("Cannot import test module '{}': {}".format(
+                    module_name, e)) from e
+        return Registry.testcases(module_names, baseclasses = baseclasses)
+
+    @staticmethod
+    def load_entry_points(group = ENTRY_POINT_GROUP, *,
+            baseclasses = [ 'TestCase' ]):
+        """Import the test modules listed by installed distributions.
+
+        Each entry point in @group names a module, 'name = foo.bar'. An entry
+        point naming an object in a module, 'name = foo.bar:obj', loads the
+        whole module foo.bar.
+
+        Returns:
+            A list of (full_cls_name, cls) tuples, see testcases().
+
+        Raises:
+            RegistryError: A module cannot be imported, or entry points cannot
+                be read, i.e., on python 3.7 without importlib_metadata.
+        """
+        try:
+            import importlib.metadata as metadata
+        except ImportError:
+            # Python 3.7, the backport if installed.
+            try:
+                import importlib_metadata as metadata
+            except ImportError as e:
+                raise RegistryError('Reading entry points requires python 3.8 '
+                    'or importlib_metadata: {}'.format(e)) from e
+        entry_points = metadata.entry_points()
+        if hasattr(entry_points, 'select'):
+            entry_points = entry_points.select(group = group)
+        else:
+            entry_points = entry_points.get(group, [])
+        module_names = []
+        for entry_point in entry_points:
+            module_name = entry_point.value.split(':')[0].strip()
+            if not module_name in module_names:
+                module_names.append(module_name)
+        return Registry.load_modules(module_names, baseclasses = baseclasses)
+
+    @staticmethod
+    def _is_subclass(cls, regex, matches):
+        """Does the full name of a base class of @cls match @regex.
+
+        The full name of a class is the name of its module and its own name,
+        like Discover.load_file() does.
+
+        Args:
+            regex: See PyName.re_compile().
+            matches: { super_cls : bool }, the results for base classes so
+                far, updated.
+        """
+        for super_cls in cls.__mro__[1:]:
+            if not super_cls in matches:
+                matches[super_cls] = not regex.match('{}.{}'.format(
+                    super_cls.__module__, super_cls.__name__)) is None
+            if matches[super_cls]:
+                return True
+        return False
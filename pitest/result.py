@@ -17,6 +17,8 @@ class TestCaseResult(object):
             directly blocked by any failed test method are not included here.
         _unknown_tests: A list of test methods that are not run but do not have
             failed prerequisites.
+        _duration: Wall-clock seconds it took to run the test case, None if not
+            measured.
     """
 
     def __init__(self, testcase_name):
@@ -25,6 +27,7 @@ class TestCaseResult(object):
         self._failure = {}
         self._blocked_tests = {}
         self._unknown_tests = []
+        self._duration = None
 
     def add_success(self, test):
         """Add a test method to the list of successful tests. """
@@ -57,6 +60,20 @@ class TestCaseResult(object):
         """
         self._unknown_tests = copy.deepcopy(unknown_tests)
 
+    def set_duration(self, duration):
+        """Set the wall-clock seconds it took to run the test case."""
+        self._duration = duration
+
+    @property
+    def name(self):
+        """Name of the test case."""
+        return self._testcase
+
+    @property
+    def duration(self):
+        """Wall-clock seconds it took to run the test case, None if unknown."""
+        return self._duration
+
     @property
     def success(self):
         """Is all tests successfully finished?"""
@@ -149,6 +166,11 @@ class TestSuiteResult(object):
         """Set the list of indirectly blocked test cases. """
         self._unknown_testcases = unknown_testcases
 
+    @property
+    def testcase_results(self):
+        """The list of TestCaseResult objects of test cases that are run."""
+        return self._testcase_results
+
     @property
     def success(self):
         """Is all test cases successfully finished?"""
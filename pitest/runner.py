@@ -3,12 +3,32 @@ from . import scheduler
 from . import suite
 
 
+import concurrent.futures
+import gc
+import inspect
+import multiprocessing
+import os
+import time
 import traceback
 
+class RunnerError(Exception):
+    pass
+
+# (graph, args_obj) of the suite being run by forked worker processes. Set by
+# the parent right before forking so that workers inherit it, together with all
+# discovered test case classes, instead of receiving it pickled.
+_fork_context = None
+
+def _run_test_case_in_fork(task_id):
+    """Entry point of forked worker processes, see Runner.run_test_suite()."""
+    graph, args_obj = _fork_context
+    return Runner._run_test_case_by_id(graph, task_id, args_obj)
+
 class Runner(object):
 
     @staticmethod
-    def run_test_suite(suite, args_obj = None):
+    def run_test_suite(suite, args_obj = None, *, workers = 1,
+            executor = 'thread', priority = None):
         """Run all test cases for the test suite.
 
         Returns:
@@ -18,24 +38,65 @@ class Runner(object):
         Args:
             suite: An instance of a subclass of pitest.TestSuiteBase.
             args_obj: An instance of Args.
+            workers: Number of test cases to run concurrently. 1 = run test
+                cases one at a time in the calling thread. Otherwise, test
+                cases are run in a pool of @workers threads as soon as the
+                scheduler makes them available. The returned result is the same
+                as that of the serial run, test case results are listed in the
+                order the serial run would have run them.
+            executor: One of [ 'thread', 'process' ], what runs the test cases
+                when workers is greater than 1.
+                'thread': A pool of threads in this process. Suitable for I/O
+                    bound test cases.
+                'process': A pool of worker processes forked from this process
+                    after all test cases are loaded. Workers inherit loaded
+                    modules copy-on-write and receive nothing but task ids, i.e.,
+                    full class names of test cases. Results are pickled back,
+                    hence values returned by failed test methods must be
+                    picklable. Suitable for CPU bound test cases. Only available
+                    on platforms that support fork().
+            priority: A function mapping full class names of test cases to sort
+                keys, e.g., CriticalPath.key. Among the test cases that are
+                ready to run, the one with the smallest key runs first. None =
+                by full class name.
+
+        Raises:
+            RunnerError: workers is less than 1, or executor is unknown or not
+                supported on this platform.
         """
+        if workers < 1:
+            raise RunnerError('workers must be at least 1, got {}'.format(workers))
+        executors = [ 'thread', 'process' ]
+        if not executor in executors:
+            raise RunnerError("executor must be one of {}, got '{}'".format(
+                executors, executor))
+
         res = result.TestSuiteResult(suite.__class__.__name__, args_obj)
 
         graph = suite.get_deps_graph()
-        sched = scheduler.Scheduler(graph, deepcopy = False)
-        args, kwargs = ((), {}) if args_obj is None else args_obj.get_method_args('__init__')
-        while sched.available_tasks:
-            task_id = sorted(sched.available_tasks)[0]
-            sched.fetch_task(task_id)
-            testcase_cls = graph.get_data(task_id)
-            testcase_instance = testcase_cls(*args, **kwargs)
-            testcase_result = Runner.run_test_case(testcase_instance, args_obj,
-                    fullname = task_id)
-            res.add_test_case_result(testcase_result)
-            if testcase_result.success:
-                sched.deliver_task(task_id)
+        sched = scheduler.Scheduler(graph, deepcopy = False, priority = priority)
+        if workers == 1:
+            while sched.available_tasks:
+                task_id = sched.pop_next()
+                testcase_result = Runner._run_test_case_by_id(graph, task_id,
+                        args_obj)
+                res.add_test_case_result(testcase_result)
+                if testcase_result.success:
+                    sched.deliver_task(task_id)
+                else:
+                    sched.fail_task(task_id)
+        else:
+            if executor == 'thread':
+                testcase_results = Runner._run_test_cases_in_threads(graph,
+                        sched, workers, args_obj)
             else:
-                sched.fail_task(task_id)
+                testcase_results = Runner._run_test_cases_in_forks(graph,
+                        sched, workers, args_obj)
+            succeeded = { task_id: testcase_result.success for task_id,
+                    testcase_result in testcase_results.items() }
+            for task_id in Runner._serial_order(graph, succeeded,
+                    priority = priority):
+                res.add_test_case_result(testcase_results[task_id])
 
         res.set_blocked_testcases(sched.blocked_tasks)
         res.set_unknown_testcases(sched.unknown_tasks)
@@ -55,34 +116,199 @@ class Runner(object):
             args_obj: An instance of Args.
             fullname: The full name of the test case. If None, just use
                 case.__class__.__name__.
+
+        If case.parallel_methods is set, test methods that do not depend on
+        each other run concurrently in a thread pool, each bracketed by its own
+        setup() and teardown(). setup_instance() and teardown_instance() still
+        run once, before and after all test methods, respectively.
+
+        Raises:
+            RunnerError: case.parallel_methods is neither a bool nor a positive
+                integer.
         """
         testcase_name = fullname if fullname else case.__class__.__name__
         res = result.TestCaseResult(testcase_name)
+        start_time = time.perf_counter()
 
         graph = case.get_deps_graph()
         sched = scheduler.Scheduler(graph, deepcopy = False)
         Runner._call_method_with_args(case.setup_instance, args_obj)
-        while sched.available_tasks:
-            task_id = sorted(sched.available_tasks)[0]
-            sched.fetch_task(task_id)
-            test_method = graph.get_data(task_id)
-            Runner._call_method_with_args(case.setup, args_obj)
-
-            retval = Runner._call_method_with_args(test_method, args_obj)
-            if retval is None:
-                sched.deliver_task(task_id)
-                res.add_success(task_id)
-            else:
-                sched.fail_task(task_id)
-                res.add_failure(task_id, retval)
-            Runner._call_method_with_args(case.teardown, args_obj)
+        if case.parallel_methods:
+            workers = Runner._method_workers(case)
+            with concurrent.futures.ThreadPoolExecutor(max_workers = workers) as executor:
+                submit = lambda task_id: executor.submit(
+                        Runner._run_test_method, case, graph.get_data(task_id),
+                        args_obj)
+                retvals = Runner._run_tasks_concurrently(sched, submit, workers,
+                        succeeded = lambda retval: retval is None)
+            succeeded = { task_id: retval is None for task_id, retval in retvals.items() }
+            for task_id in Runner._serial_order(graph, succeeded):
+                if retvals[task_id] is None:
+                    res.add_success(task_id)
+                else:
+                    res.add_failure(task_id, retvals[task_id])
+        else:
+            while sched.available_tasks:
+                task_id = sched.pop_next()
+                retval = Runner._run_test_method(case, graph.get_data(task_id),
+                        args_obj)
+                if retval is None:
+                    sched.deliver_task(task_id)
+                    res.add_success(task_id)
+                else:
+                    sched.fail_task(task_id)
+                    res.add_failure(task_id, retval)
         Runner._call_method_with_args(case.teardown_instance, args_obj)
 
         res.set_blocked_tests(sched.blocked_tasks)
         res.set_unknown_tests(sched.unknown_tasks)
+        res.set_duration(time.perf_counter() - start_time)
 
         return res
 
+    @staticmethod
+    def _run_test_method(case, test_method, args_obj):
+        """Run a test method bracketed by case.setup() and case.teardown().
+
+        Returns:
+            What the test method returns, None means success.
+        """
+        Runner._call_method_with_args(case.setup, args_obj)
+        retval = Runner._call_method_with_args(test_method, args_obj)
+        if inspect.iscoroutine(retval):
+            # Close the coroutine so that it does not warn about never being
+            # awaited.
+            retval.close()
+            retval = 'coroutine test method, run it with pitest.AsyncRunner'
+        Runner._call_method_with_args(case.teardown, args_obj)
+        return retval
+
+    @staticmethod
+    def _method_workers(case):
+        """Maximum number of concurrent test methods of a test case.
+
+        Uses the same default as concurrent.futures.ThreadPoolExecutor when
+        case.parallel_methods is True.
+        """
+        if case.parallel_methods is True:
+            return min(32, (os.cpu_count() or 1) + 4)
+        if case.parallel_methods < 1:
+            raise RunnerError('{}.parallel_methods must be True or a positive integer, got {}'
+                    .format(case.__class__.__name__, case.parallel_methods))
+        return case.parallel_methods
+
+    @staticmethod
+    def _run_test_case_by_id(graph, task_id, args_obj):
+        """Instantiate the test case class of a task and run it.
+
+        Returns:
+            The TestCaseResult of the test case.
+        """
+        args, kwargs = ((), {}) if args_obj is None else args_obj.get_method_args('__init__')
+        testcase_cls = graph.get_data(task_id)
+        testcase_instance = testcase_cls(*args, **kwargs)
+        return Runner.run_test_case(testcase_instance, args_obj,
+                fullname = task_id)
+
+    @staticmethod
+    def _run_test_cases_in_threads(graph, sched, workers, args_obj):
+        with concurrent.futures.ThreadPoolExecutor(max_workers = workers) as executor:
+            submit = lambda task_id: executor.submit(
+                    Runner._run_test_case_by_id, graph, task_id, args_obj)
+            return Runner._run_tasks_concurrently(sched, submit, workers,
+                    succeeded = lambda res: res.success)
+
+    @staticmethod
+    def _run_test_cases_in_forks(graph, sched, workers, args_obj):
+        global _fork_context
+        if not 'fork' in multiprocessing.get_all_start_methods():
+            raise RunnerError("executor 'process' requires fork(), which is not available on this platform")
+        _fork_context = (graph, args_obj)
+        # Move everything loaded so far into the permanent generation so that
+        # garbage collections in the workers do not write to, hence copy, the
+        # pages shared with this process.
+        gc.collect()
+        gc.freeze()
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers = workers,
+                    mp_context = multiprocessing.get_context('fork')) as executor:
+                submit = lambda task_id: executor.submit(
+                        _run_test_case_in_fork, task_id)
+                return Runner._run_tasks_concurrently(sched, submit, workers,
+                        succeeded = lambda res: res.success)
+        finally:
+            gc.unfreeze()
+            _fork_context = None
+
+    @staticmethod
+    def _run_tasks_concurrently(sched, submit, workers, *, succeeded):
+        """Keep up to @workers tasks of @sched running until none is left.
+
+        Returns:
+            A dictionary mapping task ids to their results.
+
+        Args:
+            sched: A Scheduler object, fetched, delivered and failed by this
+                method only. Ready tasks are submitted in the order of
+                sched.pop_next().
+            submit: A callable that takes a task id and returns a
+                concurrent.futures.Future whose result is the result of that
+                task.
+            workers: Maximum number of tasks running at the same time.
+            succeeded: A callable that takes the result of a task and tells
+                whether the task is to be delivered or failed.
+
+        Raises:
+            Whatever the submitted tasks raise. Tasks that are already running
+            are waited for by the caller's executor.
+        """
+        results = {}
+        running = {}
+        while sched.available_tasks or running:
+            while len(running) < workers:
+                task_id = sched.pop_next()
+                if task_id is None:
+                    break
+                running[submit(task_id)] = task_id
+            done, _ = concurrent.futures.wait(running,
+                    return_when = concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                task_id = running.pop(future)
+                results[task_id] = future.result()
+                if succeeded(results[task_id]):
+                    sched.deliver_task(task_id)
+                else:
+                    sched.fail_task(task_id)
+        return results
+
+    @staticmethod
+    def _serial_order(graph, succeeded, *, priority = None):
+        """The order in which the serial run would have run the tasks.
+
+        Replays the schedule of the serial run using recorded outcomes, so that
+        concurrent runs report their results in a deterministic order.
+
+        Returns:
+            A list of task ids, all of which are keys of @succeeded.
+
+        Args:
+            graph: The dependency graph the tasks were scheduled with.
+            succeeded: A dictionary mapping the task ids that were run to
+                whether they were delivered (True) or failed (False).
+            priority: The sort key the serial run picks tasks by, see
+                run_test_suite().
+        """
+        sched = scheduler.Scheduler(graph, deepcopy = False, priority = priority)
+        order = []
+        while sched.available_tasks:
+            task_id = sched.pop_next()
+            order.append(task_id)
+            if succeeded[task_id]:
+                sched.deliver_task(task_id)
+            else:
+                sched.fail_task(task_id)
+        return order
+
     @staticmethod
     def _call_method_with_args(method, args_obj):
         if args_obj is None:
@@ -1,10 +1,17 @@
 from . import dag
 
-import copy
+import array
+import heapq
+import threading
+import time
 
 class SchedulerError(Exception):
     pass
 
+# Task status, stored as integers in Scheduler._status.
+_UNTOUCHED, _FETCHED, _DELIVERED, _FAILED = range(4)
+_status_names = ( 'untouched', 'fetched', 'delivered', 'failed' )
+
 class Scheduler(object):
     """
     A dynamic scheduler based on directed acyclic graph (DAG).
@@ -12,40 +19,65 @@ class Scheduler(object):
     An edge A -> B is interpreted as 'A depends on B.'
 
     Attributes:
-        _dag: An dag.DAG object.
-        _task_status: A dicitonary holding the status of tasks.
+        _dag: A dag.FrozenDAG object.
+        _ids: List of task ids. Tasks are internally referred to by their
+            indices in this list, the node indices in _dag.
+        _index: Dictionary mapping task ids to their indices.
+        _status: Array holding the status of tasks, indexed by task index.
+        _num_pending: Array holding the number of prerequisites of tasks that
+            are not delivered yet, indexed by task index. A task becomes
+            available when its count drops to zero.
         _available_tasks: Tasks that can run concurrently.
+        _ready: Heap of (sort key, task id) of available tasks that may not be
+            fetched yet, popped by pop_next(). Entries of tasks fetched by
+            fetch_task() are discarded lazily.
+        _priority: Sort key of task ids, None = by task id.
         _blocked_tasks: Dicionary mapping blocked tasks to their blocking tasks.
+        _num_stalled: Array holding the number of prerequisites of tasks that
+            are failed or stalled, indexed by task index.
+        _stalled: Set of indices of tasks with at least one failed or stalled
+            prerequisite, i.e., tasks that are blocked, directly or not, by
+            failed tasks. Maintained incrementally by fail_task() and by
+            re-fetching failed tasks.
     """
 
-    _status_set = { 'untouched', 'fetched', 'delivered', 'failed' }
+    _status_set = set(_status_names)
 
-    def __init__(self, deps_graph: dag.DAG, *, deepcopy = True):
+    def __init__(self, deps_graph: dag.DAG, *, deepcopy = True, priority = None):
         """
         deps_graph:
-            Must be dag.DAG object.
-            Access the 'private' fields in dag.DAG.
-            Used in a read-only manner.
+            Must be dag.DAG or dag.FrozenDAG object.
+            A dag.DAG is frozen into a dag.FrozenDAG, in one pass, so altering
+            it afterwards does not affect the scheduler. A dag.FrozenDAG is
+            used as is and can be shared by many schedulers.
 
         deepcopy:
-            Deep copy the deps_graph, just in case the graph is altered
-            unexpected. Safe to not use deepcopy if the graph will not be
-            altered during the lifetime of this scheduler object.
+            Kept for compatibility and ignored, freezing already snapshots the
+            graph.
+
+        priority:
+            A function mapping task ids to sort keys. pop_next() fetches the
+            available task with the smallest key. None = by task id.
         """
-        self._dag = copy.deepcopy(deps_graph) if deepcopy else deps_graph
-        self._task_status = {}
-        for id in self._dag._nodes:
-            self._task_status[id] = 'untouched'
-        self._available_tasks = set(self._dag.sinks)
-        self._blocked_tasks = dict()
+        self._priority = priority
+        self._dag = deps_graph.freeze()
+        self._ids = self._dag._ids
+        self._index = self._dag._index
+        self.reset()
 
     def reset(self):
         """
         Reset scheduler to the same status after __init__().
         """
-        self._change_status('untouched')
+        self._status = array.array('b', [ _UNTOUCHED ]) * len(self._ids)
+        self._num_pending = array.array('l',
+                [ self._dag.out_degree(index) for index in range(len(self._ids)) ])
         self._available_tasks = set(self._dag.sinks)
+        self._ready = [ self._ready_entry(id) for id in self._available_tasks ]
+        heapq.heapify(self._ready)
         self._blocked_tasks = dict()
+        self._num_stalled = array.array('l', [ 0 ]) * len(self._ids)
+        self._stalled = set()
 
     @property
     def available_tasks(self):
@@ -63,13 +95,24 @@ class Scheduler(object):
         are those tasks all of whose prerequisite are either blocked or unknown.
         If a blocked task has any failed prerequisites, it is a blocked task,
         not an unknown task.
+
+        Tasks that are merely waiting for prerequisites that are not finished
+        yet are neither. Once no task is available, every untouched task is
+        either blocked or unknown.
+
+        The list is in the order the tasks were added to the graph.
         """
         pool = []
-        for task_id, status in self._task_status.items():
-            if status == 'untouched' and not task_id in self.blocked_tasks:
+        for index in sorted(self._stalled):
+            task_id = self._ids[index]
+            if self._status[index] == _UNTOUCHED and not task_id in self._blocked_tasks:
                 pool.append(task_id)
         return pool
 
+    def status(self, task_id):
+        """The status of a task, one of the names in Scheduler._status_set."""
+        return _status_names[self._status[self._index[task_id]]]
+
     def fetch_task(self, task_id, *, fetched_ok = False, failed_ok = False):
         """Atomically mark a task as fetched.
 
@@ -80,6 +123,8 @@ class Scheduler(object):
         If the task_id is 'failed' and failed_ok is True,
             - remove task_id from lists of blocking tasks in blocked_tasks, and
             - add task_id back to available_tasks.
+        Only the depending tasks of task_id, and the tasks they stall, are
+        updated.
 
         Raises:
             SchedulerError: if the task if already fetched or delivered.
@@ -88,20 +133,24 @@ class Scheduler(object):
             fetch_task() does not remove task from the available_tasks. Tasks
             are removed from available_tasks when they are delivered or failed.
         """
-        if not fetched_ok and self._task_status[task_id] == 'fetched':
+        index = self._index[task_id]
+        status = self._status[index]
+        if not fetched_ok and status == _FETCHED:
             raise SchedulerError("Cannot fetch a fetched task '{}' without fetched_ok".format(task_id))
-        if self._task_status[task_id] == 'delivered':
+        if status == _DELIVERED:
             raise SchedulerError("Cannot fetch a delivered task '{}' without delivered_ok".format(task_id))
-        if self._task_status[task_id] == 'failed':
+        if status == _FAILED:
             if not failed_ok:
                 raise SchedulerError("Cannot fetch a failed task '{}' without failed_ok".format(task_id))
-            tmp = copy.deepcopy(self.blocked_tasks)
-            for blocked_task_id, blocking_set in tmp.items():
+            for parent_index in self._dag.in_indices(index):
+                parent = self._ids[parent_index]
+                blocking_set = self._blocked_tasks[parent]
                 blocking_set.discard(task_id)
                 if len(blocking_set) == 0:
-                    del self._blocked_tasks[blocked_task_id]
+                    del self._blocked_tasks[parent]
+            self._propagate_stall(index, -1)
             self._available_tasks.add(task_id)
-        self._task_status[task_id] = 'fetched'
+        self._status[index] = _FETCHED
 
     def deliver_task(self, task_id, *, nofetch_ok = False):
         """Atomically mark a previously fetched task as delivered.
@@ -110,6 +159,11 @@ class Scheduler(object):
         available_tasks if all prerequisites of the depending task are
         delivered.
 
+        Every task keeps count of its prerequisites that are not delivered yet.
+        Delivering a task decrements the counts of its depending tasks, those
+        reaching zero become available. The cost is linear in the number of
+        depending tasks of the delivered task.
+
         Args:
             nofetch_ok: Do not raise error if the task being delivered is not
                 fetched. 
@@ -118,25 +172,45 @@ class Scheduler(object):
             SchedulerError: if the task being delivered was not previously
                 fetched, or is already delivered or failed.
         """
-        if not nofetch_ok and self._task_status[task_id] != 'fetched':
+        index = self._index[task_id]
+        if not nofetch_ok and self._status[index] != _FETCHED:
             raise SchedulerError("Cannot deliver a task (id = '{}') that was not previously fetched."
                     .format(task_id))
-        self._task_status[task_id] = 'delivered'
+        if self._status[index] == _DELIVERED:
+            raise SchedulerError("Cannot deliver a task (id = '{}') that is already delivered."
+                    .format(task_id))
         self._available_tasks.remove(task_id)
-        for parent in self._dag._in[task_id]:
-            is_ready = True
-            for child in self._dag._out[parent]:
-                if self._task_status[child] != 'delivered':
-                    is_ready = False
-                    break
-            if is_ready:
+        self._status[index] = _DELIVERED
+        for parent_index in self._dag.in_indices(index):
+            self._num_pending[parent_index] -= 1
+            if self._num_pending[parent_index] == 0:
+                parent = self._ids[parent_index]
                 self._available_tasks.add(parent)
+                heapq.heappush(self._ready, self._ready_entry(parent))
+
+    def pop_next(self):
+        """Fetch the available task with the smallest sort key.
+
+        Costs O(log n) per fetched task, instead of sorting available_tasks.
+        Tasks already fetched by fetch_task() are skipped.
+
+        Returns:
+            The id of the fetched task, or None if every available task is
+            already fetched.
+        """
+        while self._ready:
+            task_id = heapq.heappop(self._ready)[1]
+            if self._status[self._index[task_id]] == _UNTOUCHED:
+                self.fetch_task(task_id)
+                return task_id
+        return None
 
     def fail_task(self, task_id, *, nofetch_ok = False):
         """Atomically mark a previously fetched task as failed.
 
         Remove task_id from available_tasks, add its depending tasks to
-        blocked_tasks.
+        blocked_tasks. All tasks depending on task_id, directly or not, are
+        marked as stalled once, here.
 
         Args:
             nofetch_ok: Do not raise error if the task being failed is not
@@ -146,29 +220,58 @@ class Scheduler(object):
             SchedulerError: if the task being failed was not previously fetched,
                 or is already delivered or failed.
         """
-        if not nofetch_ok and self._task_status[task_id] != 'fetched':
+        index = self._index[task_id]
+        if not nofetch_ok and self._status[index] != _FETCHED:
             raise SchedulerError("Cannot fail a task (id = '{}') that was not previously fetched."
                     .format(task_id))
-        self._task_status[task_id] = 'failed'
         self._available_tasks.remove(task_id)
-        for parent in self._dag._in[task_id]:
+        self._status[index] = _FAILED
+        for parent_index in self._dag.in_indices(index):
+            parent = self._ids[parent_index]
             if parent in self._blocked_tasks:
                 self._blocked_tasks[parent].add(task_id)
             else:
                 self._blocked_tasks[parent] = { task_id }
+        self._propagate_stall(index, 1)
 
+    # The bulk versions take a snapshot of task_ids, which may be one of the
+    # sets modified by the operation, e.g., available_tasks.
     def fetch_tasks(self, task_ids, **kwargs):
-        for id in copy.deepcopy(task_ids):
+        for id in list(task_ids):
             self.fetch_task(id, **kwargs)
     
     def deliver_tasks(self, task_ids, **kwargs):
-        for id in copy.deepcopy(task_ids):
+        for id in list(task_ids):
             self.deliver_task(id, **kwargs)
 
     def fail_tasks(self, task_ids, **kwargs):
-        for id in copy.deepcopy(task_ids):
+        for id in list(task_ids):
             self.fail_task(id, **kwargs)
 
+    def _propagate_stall(self, index, delta):
+        """Add @delta to the stall counts of the depending tasks of @index.
+
+        A task whose count goes from zero to one becomes stalled, one whose
+        count drops back to zero is no longer stalled. Either way, the change
+        propagates to its own depending tasks. Each task is visited at most
+        once per failure or re-fetch of a failed task.
+        """
+        stack = [ index ]
+        while stack:
+            curr = stack.pop()
+            for parent_index in self._dag.in_indices(curr):
+                self._num_stalled[parent_index] += delta
+                if delta > 0 and self._num_stalled[parent_index] == 1:
+                    self._stalled.add(parent_index)
+                    stack.append(parent_index)
+                elif delta < 0 and self._num_stalled[parent_index] == 0:
+                    self._stalled.discard(parent_index)
+                    stack.append(parent_index)
+
+    def _ready_entry(self, task_id):
+        key = task_id if self._priority is None else self._priority(task_id)
+        return (key, task_id)
+
     def _change_status(self, status, *, task_id = None):
         """Internal helper for changing the status of a given task or all tasks.
 
@@ -177,11 +280,109 @@ class Scheduler(object):
 
         task_id:
             None = all tasks.
+
+        NOTE: Does not update the prerequisite counts, available_tasks or
+        blocked_tasks.
         """
         if not status in Scheduler._status_set:
             raise SchedulerError("Unknown status '{}'. Must be {}".format(status, Scheduler._status_set))
+        value = _status_names.index(status)
         if task_id is None:
-            for tid in self._task_status:
-                self._task_status[tid] = status
+            self._status = array.array('b', [ value ]) * len(self._ids)
         else:
-            self._task_status[task_id] = status
+            self._status[self._index[task_id]] = value
+
+class ConcurrentScheduler(Scheduler):
+    """
+    A thread-safe Scheduler.
+
+    fetch, deliver and fail are atomic, and so are reading the task sets, which
+    are returned as snapshots. Consumers need not poll available_tasks:
+    acquire_next() blocks until a task can be fetched, fetches it and returns
+    its id.
+
+    Attributes:
+        DRAINED: Returned by acquire_next() when no more task can be fetched,
+            i.e., all tasks are delivered, failed, or blocked by failed tasks.
+        _cond: Condition variable guarding all states, notified whenever a task
+            is delivered or failed.
+    """
+
+    DRAINED = object()
+
+    def __init__(self, deps_graph: dag.DAG, **kwargs):
+        """See Scheduler.__init__()."""
+        # Reentrant so that methods of the base class can call each other.
+        self._cond = threading.Condition(threading.RLock())
+        super().__init__(deps_graph, **kwargs)
+
+    def reset(self):
+        with self._cond:
+            super().reset()
+            self._cond.notify_all()
+
+    @property
+    def available_tasks(self):
+        """A snapshot of the set of available tasks."""
+        with self._cond:
+            return set(self._available_tasks)
+
+    @property
+    def blocked_tasks(self):
+        """A snapshot of the mapping of blocked tasks to blocking tasks."""
+        with self._cond:
+            return { id: set(blocking) for id, blocking in self._blocked_tasks.items() }
+
+    @property
+    def unknown_tasks(self):
+        with self._cond:
+            return super().unknown_tasks
+
+    def fetch_task(self, task_id, **kwargs):
+        with self._cond:
+            super().fetch_task(task_id, **kwargs)
+
+    def deliver_task(self, task_id, **kwargs):
+        with self._cond:
+            super().deliver_task(task_id, **kwargs)
+            self._cond.notify_all()
+
+    def fail_task(self, task_id, **kwargs):
+        with self._cond:
+            super().fail_task(task_id, **kwargs)
+            self._cond.notify_all()
+
+    def pop_next(self):
+        with self._cond:
+            return super().pop_next()
+
+    def acquire_next(self, timeout = None):
+        """Wait for an available task that is not fetched yet and fetch it.
+
+        Returns:
+            The id of the fetched task. Or DRAINED if no more task can become
+            available. Or None if @timeout expired while tasks fetched by others
+            were still being executed.
+
+        Args:
+            timeout: Maximum number of seconds to wait. None = wait until a task
+                can be fetched or the scheduler is drained.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                # Fetched tasks stay in available_tasks until they are
+                # delivered or failed. Hence, an empty available_tasks means
+                # nothing is running and nothing can become available.
+                if not self._available_tasks:
+                    return ConcurrentScheduler.DRAINED
+                task_id = self.pop_next()
+                if not task_id is None:
+                    return task_id
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
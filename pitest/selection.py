@@ -0,0 +1,214 @@
+import fnmatch
+import re
+
+class SelectionError(Exception):
+    pass
+
+# The kinds of targets, see Selector.
+TARGET_KINDS = ( 'case', 'method', 'test' )
+
+# Words with a meaning in keyword expressions, see Selector.
+_KEYWORD_OPERATORS = { 'and', 'or', 'not', '(', ')' }
+
+def _compile_keyword(expression):
+    """Compile a keyword expression, see Selector.
+
+    Returns:
+        A function mapping a lowercase test name to True if the expression
+        selects it.
+
+    Raises:
+        SelectionError: The expression is empty or not well formed.
+    """
+    tokens = re.findall(r'\(|\)|[^\s()]+', expression)
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take():
+        nonlocal pos
+        token = peek()
+        pos += 1
+        return token
+
+    def error(msg):
+        return SelectionError("Invalid keyword expression '{}': {}".format(
+            expression, msg))
+
+    def parse_or():
+        operands = [ parse_and() ]
+        while peek() == 'or':
+            take()
+            operands.append(parse_and())
+        if len(operands) == 1:
+            return operands[0]
+        return lambda name: any(operand(name) for operand in operands)
+
+    def parse_and():
+        operands = [ parse_not() ]
+        while peek() == 'and':
+            take()
+            operands.append(parse_not())
+        if len(operands) == 1:
+            return operands[0]
+        return lambda name: all(operand(name) for operand in operands)
+
+    def parse_not():
+        token = take()
+        if token == 'not':
+            operand = parse_not()
+            return lambda name: not operand(name)
+        if token == '(':
+            operand = parse_or()
+            if take() != ')':
+                raise error("missing ')'")
+            return operand
+        if token is None:
+            raise error('unexpected end')
+        if token in _KEYWORD_OPERATORS:
+            raise error("unexpected '{}'".format(token))
+        word = token.lower()
+        return lambda name: word in name
+
+    retval = parse_or()
+    if not peek() is None:
+        raise error("unexpected '{}'".format(peek()))
+    return retval
+
+class _SelectedTestCase(object):
+    """Stands in for a test case class of which only some tests are selected.
+
+    Instances it creates only run the selected tests and their prerequisites,
+    see TestCase.get_deps_graph().
+    """
+
+    def __init__(self, cls, test_names):
+        self._cls = cls
+        self._test_names = test_names
+
+    def __call__(self, *args, **kwargs):
+        instance = self._cls(*args, **kwargs)
+        instance._selected_tests = self._test_names
+        return instance
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self._cls, name)
+
+class Selector(object):
+    """Select tests by name, by targets and by a keyword expression.
+
+    A test is a test method of a test case, named after both:
+
+        full_cls_name.method_name
+
+    A target is a glob pattern, matching a name if it matches all of it, or
+    the end of it after a dot, like deps do. What targets match depends on
+    their kind:
+
+        'case': The names of test cases, a target selects all of the tests of
+            the test cases it matches, e.g., 'foo.Case1' or 'Case*'.
+        'method' or 'test': The names of tests, a target selects the tests it
+            matches, e.g., 'Case1.test_bar' or 'test_ba?'.
+        None: Both, but only targets with a dot match the names of tests.
+
+    The test methods of a test case are only listed, which imports the test
+    case if it is lazily loaded, when a target may name one of them, i.e., the
+    part of the target before its last dot matches the name of the test case,
+    or with a keyword expression. Otherwise the name of the test case decides.
+
+    A keyword expression combines words with 'and', 'or', 'not' and
+    parentheses, e.g., 'foo and not (slow or flaky)'. A word is true for a
+    test if it is part of its name, ignoring case.
+
+    A test is selected if it is selected by a target, if any, and by the
+    keyword expression, if any. Targets are compiled into one regex and the
+    keyword expression into a function, once.
+
+    Typical use, through a suite:
+        suite.select([ 'Case1', 'Case2.test_foo' ], keyword = 'not slow')
+        pitest.Runner.run_test_suite(suite)
+    """
+
+    def __init__(self, targets = None, *, keyword = None, kind = None):
+        """
+        Args:
+            targets: A list of targets. None or empty = all tests.
+            keyword: A keyword expression. None = all tests.
+            kind: What the targets match, one of TARGET_KINDS, or None for
+                both.
+
+        Raises:
+            SelectionError: The keyword expression is not well formed, or kind
+                is unknown.
+        """
+        if not kind is None and not kind in TARGET_KINDS:
+            raise SelectionError("Unknown kind of targets '{}'".format(kind))
+        self._all = not targets
+        # Regexes matching the names of test cases targeted as a whole, the
+        # names of the test cases targets may name tests of, and the names of
+        # tests, None = no such targets.
+        self._cases = self._prefixes = self._tests = None
+        if targets:
+            if kind != 'method' and kind != 'test':
+                self._cases = Selector._compile(targets)
+            if kind != 'case':
+                tests = [ target for target in targets
+                        if not kind is None or '.' in target ]
+                self._prefixes = Selector._compile([ target.rpartition('.')[0]
+                    or '*' for target in tests ])
+                self._tests = Selector._compile(tests)
+        self._keyword = None
+        if not keyword is None:
+            self._keyword = _compile_keyword(keyword)
+
+    def select(self, testcases):
+        """Select tests of test cases.
+
+        Returns:
+            A dictionary mapping the full names of the test cases with
+            selected tests to the tuples of the names of their selected test
+            methods, None if all of them are selected. Prerequisites are not
+            included.
+
+        Args:
+            testcases: A list of (full_cls_name, cls) tuples.
+        """
+        retval = {}
+        for full_cls_name, cls in testcases:
+            case_matched = self._all or Selector._match(self._cases,
+                    full_cls_name)
+            if case_matched and self._keyword is None:
+                retval[full_cls_name] = None
+                continue
+            if not case_matched and not Selector._match(self._prefixes,
+                    full_cls_name):
+                continue
+            all_names = cls._get_test_method_names()
+            names = []
+            for method_name in all_names:
+                test_name = '{}.{}'.format(full_cls_name, method_name)
+                if not case_matched and not Selector._match(self._tests,
+                        test_name):
+                    continue
+                if not self._keyword is None and not self._keyword(test_name.lower()):
+                    continue
+                names.append(method_name)
+            if names:
+                retval[full_cls_name] = (None if len(names) == len(all_names)
+                        else tuple(names))
+        return retval
+
+    @staticmethod
+    def _compile(targets):
+        """One regex matching what any of @targets matches, None if none."""
+        if not targets:
+            return None
+        return re.compile(r'(?s:.*\.)?(?:{})'.format('|'.join(
+            fnmatch.translate(target) for target in targets)))
+
+    @staticmethod
+    def _match(regex, name):
+        return not regex is None and not regex.match(name) is None
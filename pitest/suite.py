@@ -1,10 +1,9 @@
 from . import case
 from . import dag
 from . import discover
-
-import inspect
-import fnmatch
-import re
+from . import name
+from . import registry
+from . import selection
 
 class TestSuiteBaseError(Exception):
     pass
@@ -32,6 +31,8 @@ class TestSuiteBase(object):
 
     def __init__(self):
         self._testcases = []
+        self._deps_cache = None
+        self._selector = None
 
     @property
     def testcases(self):
@@ -39,13 +40,24 @@ class TestSuiteBase(object):
         return self._testcases
 
     def discover(self, start_dir, *, recursive = True, pattern = '*.py',
-            notestcase_ok = False):
+            notestcase_ok = False, prescan = False, cache = None, lazy = False,
+            exclude = None, skip_venv = None, gitignore = False):
         """Discover test cases starting from @start_dir.
 
         Args:
             recursive: True if discover test cases recursively. False otherwise.
-            pattern: The glob pattern to match filenames.
+            pattern: The glob pattern, or a list of them, to match filenames.
+            exclude: Glob patterns of files and directories to skip, see
+                Discover.walk().
+            skip_venv: Skip virtual environments, see Discover.walk().
+            gitignore: Skip what .gitignore files ignore, see Discover.walk().
             nocase_ok: OK if no test cases are discovered.
+            prescan: Only import files that may define test cases, see
+                Discover.prescan().
+            cache: A DiscoverCache object. Test cases of unchanged cached files
+                are loaded as TestCaseInfo objects, imported only when run.
+            lazy: Only import the files of the test cases that are run, see
+                Discover.discover().
 
         Raises:
             DiscoverError: An error occurred when discovering tests.
@@ -55,7 +67,13 @@ class TestSuiteBase(object):
         testcases = discover.Discover.discover(start_dir,
                 baseclasses = self.testcase_baseclasses,
                 recursive = recursive,
-                pattern = pattern)
+                pattern = pattern,
+                exclude = exclude,
+                skip_venv = skip_venv,
+                gitignore = gitignore,
+                prescan = prescan,
+                cache = cache,
+                lazy = lazy)
         if not testcases and not notestcase_ok:
             raise TestSuiteBaseError("suite.discover('{}') did not find any test cases.".format(start_dir))
         self._add_testcases(testcases)
@@ -78,6 +96,70 @@ class TestSuiteBase(object):
                 "suite.load_file('{}') did not find any test cases.".format(fname))
         self._add_testcases(testcases)
 
+    def load_modules(self, module_names, *, notestcase_ok = False):
+        """Load test cases from modules, by module name, without discovery.
+
+        Only test cases registered when the modules are imported are loaded,
+        see Registry.
+
+        Args:
+            module_names: Importable module names, e.g., [ 'foo.bar' ].
+            notestcase_ok: OK if no test cases are loaded.
+
+        Raises:
+            RegistryError: A module cannot be imported.
+            NoTestCaseLoadedError: No test case is loaded and notestcase_ok is
+                False.
+        """
+        testcases = registry.Registry.load_modules(module_names,
+                baseclasses = self.testcase_baseclasses)
+        if not testcases and not notestcase_ok:
+            raise NoTestCaseLoadedError(
+                "suite.load_modules({}) did not find any test cases.".format(
+                    module_names))
+        self._add_testcases(testcases)
+
+    def load_entry_points(self, group = registry.ENTRY_POINT_GROUP, *,
+            notestcase_ok = False):
+        """Load test cases from the test modules listed in entry points.
+
+        See Registry.load_entry_points() and load_modules().
+        """
+        testcases = registry.Registry.load_entry_points(group,
+                baseclasses = self.testcase_baseclasses)
+        if not testcases and not notestcase_ok:
+            raise NoTestCaseLoadedError(
+                "suite.load_entry_points('{}') did not find any test cases."
+                .format(group))
+        self._add_testcases(testcases)
+
+    def select(self, targets = None, *, keyword = None, kind = None):
+        """Only run the selected tests, and the tests they depend on.
+
+        From then on, get_deps_graph() only has the test cases with selected
+        tests and their prerequisites, direct or not, so runners only run
+        those. Prerequisite test cases run all of their tests. Test cases with
+        only some tests selected only run those and their prerequisites within
+        the test case, see TestCase._internal_deps.
+
+        Returns:
+            The selected tests, prerequisites excluded, see Selector.select().
+
+        Args:
+            targets, keyword, kind: See Selector. None for targets and
+                keyword = select all tests again.
+
+        Raises:
+            SelectionError: The keyword expression is not well formed, or kind
+                is unknown.
+        """
+        if targets is None and keyword is None:
+            self._selector = None
+            return { fullname: None for fullname, test in self.testcases }
+        self._selector = selection.Selector(targets, keyword = keyword,
+                kind = kind)
+        return self._selector.select(self.testcases)
+
     def get_deps_graph(self) -> dag.DAG:
         """Build the dependency graph for all loaded test cases.
 
@@ -90,21 +172,67 @@ class TestSuiteBase(object):
         Attributes:
             self..deps: Dependencies are specified in deps, a class variable in
                 test case classs. It supported glob pattern, e.g., 'FooClass1*'.
+                A pattern matches a test case if it matches its full name, or
+                the end of its full name after a dot, see name.NameIndex.
+
+        The resolved dependencies are cached until the loaded test cases or
+        their deps change.
+
+        If tests are selected, see select(), the graph only has the test cases
+        that run.
+
+        Raises:
+            Py3DAGCycleError: Test cases depend on each other in a cycle. Caught
+                here, before running anything, instead of leaving the test cases
+                on the cycle unknown at the end of a run.
 
         TODO: Report error when trying to reference unloaded modules.
         """
+        key = tuple((fullname, test, tuple(test.deps))
+                for fullname, test in self.testcases)
+        cached = not self._deps_cache is None and self._deps_cache[0] == key
+        if cached:
+            prerequisites = self._deps_cache[1]
+        else:
+            index = name.NameIndex(fullname for fullname, test in self.testcases)
+            prerequisites = [ [ prerequisite
+                    for prerequisite_pattern in test.deps
+                    for prerequisite in index.match(prerequisite_pattern) ]
+                    for fullname, test in self.testcases ]
+
         graph = dag.DAG()
         for fullname, test in self.testcases:
             graph.add_node(fullname, test)
+        for (fullname, test), prerequisite_list in zip(self.testcases,
+                prerequisites):
+            for prerequisite in prerequisite_list:
+                graph.add_edge(fullname, prerequisite)
+
+        if not cached:
+            graph.check_acyclic(raise_error = True)
+            self._deps_cache = (key, prerequisites)
+        if not self._selector is None:
+            graph = self._select_subgraph(graph)
+        return graph
 
-        for fullname, test in self.testcases:
-            for prerequisite_pattern in test.deps:
-                reg_pattern = '^(({0})|(.*\.{0}))$'.format(prerequisite_pattern)
-                for prerequisite in graph._nodes:
-                    if re.match(reg_pattern, prerequisite):
-                        graph.add_edge(fullname, prerequisite)
+    def _select_subgraph(self, graph):
+        """The test cases of @graph with selected tests and their prerequisites.
 
-        return graph
+        Test cases with some of their tests selected are wrapped so that only
+        those run.
+        """
+        selected = self._selector.select(self.testcases)
+        ids = graph.closure(selected)
+        subgraph = dag.DAG()
+        for fullname, test in self.testcases:
+            if fullname in ids:
+                test_names = selected.get(fullname)
+                subgraph.add_node(fullname, test if test_names is None
+                        else selection._SelectedTestCase(test, test_names))
+        for fullname in subgraph._nodes:
+            for prerequisite in graph._out[fullname]:
+                subgraph.add_edge(fullname, prerequisite)
+        return subgraph
 
     def _add_testcases(self, testcases):
         self._testcases += testcases
@@ -19,6 +19,7 @@ if __name__ == '__main__':
         keywords = ['test', 'unittest'],
         license = [ 'GPL3', 'LGPL' ],
         packages=['pitest'],
+        python_requires='>=3.7',
         classifiers = [
             "Programming Language :: Python :: 3",
             "Intended Audience :: Developers",
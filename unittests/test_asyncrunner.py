@@ -0,0 +1,145 @@
+import asyncio
+import contextlib
+import io
+import os
+import pitest
+import unittest
+
+# A -> B: A depends on B
+#   2 ---> 0
+#     \
+#      --> 1 ---> 3
+
+class AsyncCaseBase(pitest.TestCase):
+    async def setup_instance(self):
+        await asyncio.sleep(0)
+        print('{}.setup_instance'.format(self.__class__.__name__))
+    async def teardown_instance(self):
+        print('{}.teardown_instance'.format(self.__class__.__name__))
+class AsyncCase0(AsyncCaseBase):
+    _internal_deps = { 'test_b': [ 'test_a' ] }
+    async def test_a(self):
+        await asyncio.sleep(0)
+        print('AsyncCase0.test_a')
+    def test_b(self):
+        print('AsyncCase0.test_b')
+class AsyncCase1(AsyncCaseBase):
+    deps = [ 'AsyncCase3' ]
+    async def test_fail(self):
+        return 'failed'
+class AsyncCase2(AsyncCaseBase):
+    deps = [ 'AsyncCase0', 'AsyncCase1' ]
+class AsyncCase3(AsyncCaseBase):
+    pass
+
+class AsyncSuite(pitest.TestSuiteBase):
+    testcase_baseclasses = [ 'AsyncCaseBase' ]
+
+class OverlapCaseBase(pitest.TestCase):
+    pass
+class OverlapCase0(OverlapCaseBase):
+    async def test_wait(self):
+        # Only passes if OverlapCase1 runs at the same time.
+        for i in range(100):
+            if OverlapCase1.started:
+                return
+            await asyncio.sleep(0)
+        return 'not overlapped'
+class OverlapCase1(OverlapCaseBase):
+    started = False
+    async def test_start(self):
+        OverlapCase1.started = True
+
+class OverlapSuite(pitest.TestSuiteBase):
+    testcase_baseclasses = [ 'OverlapCaseBase' ]
+
+class ParallelMethodsCase(pitest.TestCase):
+    parallel_methods = True
+    _internal_deps = { 'test_last': [ 'test_wait*' ] }
+    def __init__(self):
+        self.started = set()
+        self.events = []
+    def setup(self):
+        self.events.append('setup')
+    async def test_wait1(self):
+        # Only passes if test_wait2 runs at the same time.
+        self.started.add('test_wait1')
+        for i in range(100):
+            if 'test_wait2' in self.started:
+                return
+            await asyncio.sleep(0)
+        return 'not overlapped'
+    async def test_wait2(self):
+        self.started.add('test_wait2')
+    def test_last(self):
+        self.events.append('test_last')
+
+class CoroutineOnlyCase(pitest.TestCase):
+    async def test_foo(self):
+        pass
+
+class TestAsyncRunner(unittest.TestCase):
+
+    def test_run_suite(self):
+        fname = os.path.relpath(__file__)
+        suite = AsyncSuite()
+        suite.load_file(fname)
+        buf = io.StringIO()
+        with contextlib.redirect_stdout(buf):
+            result = pitest.AsyncRunner.run_test_suite(suite, concurrency = 1)
+        expected_stdout = """\
+AsyncCase0.setup_instance
+AsyncCase0.test_a
+AsyncCase0.test_b
+AsyncCase0.teardown_instance
+AsyncCase3.setup_instance
+AsyncCase3.teardown_instance
+AsyncCase1.setup_instance
+AsyncCase1.teardown_instance
+"""
+        self.assertEqual(buf.getvalue(), expected_stdout)
+        expected_result_string = """\
+(no args)
+test_asyncrunner.AsyncCase0: finished 2 tests
+test_asyncrunner.AsyncCase3: finished 0 tests
+test_asyncrunner.AsyncCase1: finished 0 tests
+    FAILURE: 1
+        test_asyncrunner.AsyncCase1.test_fail: failed
+test_asyncrunner.AsyncCase2: blocked by ['test_asyncrunner.AsyncCase1']
+================================================================
+
+SUCCESS: 2
+FAILURE: 1
+BLOCKED: 1
+
+FAIL
+"""
+        self.assertEqual(str(result), expected_result_string)
+
+    def test_run_suite_concurrently(self):
+        fname = os.path.relpath(__file__)
+        suite = OverlapSuite()
+        suite.load_file(fname)
+        result = pitest.AsyncRunner.run_test_suite(suite, concurrency = 2)
+        self.assertTrue(result.success)
+        self.assertEqual(result.num_success, 2)
+
+    def test_run_case_parallel_methods(self):
+        case = ParallelMethodsCase()
+        result = asyncio.run(pitest.AsyncRunner.run_test_case(case))
+        self.assertTrue(result.success)
+        self.assertEqual(result._success, [ 'test_wait1', 'test_wait2', 'test_last' ])
+        self.assertEqual(case.events, [ 'setup', 'setup', 'setup', 'test_last' ])
+
+    def test_sync_runner_rejects_coroutines(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = pitest.Runner.run_test_case(CoroutineOnlyCase())
+        self.assertFalse(result.success)
+        self.assertIn('pitest.AsyncRunner', str(result))
+
+    def test_bad_concurrency(self):
+        with self.assertRaises(pitest.RunnerError):
+            pitest.AsyncRunner.run_test_suite(AsyncSuite(), concurrency = 0)
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 0)
@@ -0,0 +1,111 @@
+import os
+import pitest
+import sys
+import tempfile
+import unittest
+
+CASES_SOURCE = '''import pitest
+class CacheCaseBase(pitest.TestCase):
+    def test_a(self):
+        pass
+class CacheCase0(CacheCaseBase):
+    pass
+class CacheCase1(CacheCaseBase):
+    deps = [ 'CacheCase0' ]
+    _internal_deps = { 'test_b': 'test_a' }
+    def test_b(self):
+        pass
+'''
+
+class TestDiscoverCache(unittest.TestCase):
+    # Discovered paths are relative to the working directory.
+    curr_dir = os.path.dirname(os.path.realpath(__file__))
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory(dir = self.curr_dir)
+        self.cases_fname = os.path.join(self.tmpdir.name, 'cache_cases.py')
+        with open(self.cases_fname, 'w') as f:
+            f.write(CASES_SOURCE)
+        with open(os.path.join(self.tmpdir.name, 'cache_heavy.py'), 'w') as f:
+            f.write('import no_such_module_for_pitest\n')
+        self.cache_fname = os.path.join(self.tmpdir.name, 'cache.json')
+
+    def tearDown(self):
+        self._unload()
+        self.tmpdir.cleanup()
+
+    def _loaded(self):
+        return os.path.realpath(self.cases_fname) in pitest.discover._modules
+
+    def _unload(self):
+        # As if in a new process
+        module = pitest.discover._modules.pop(
+                os.path.realpath(self.cases_fname), None)
+        for module_name in [ module_name for module_name, m
+                in sys.modules.items() if m is module ]:
+            del sys.modules[module_name]
+
+    def _discover(self, **kwargs):
+        return pitest.Discover.discover(self.tmpdir.name, pattern = 'cache_*.py',
+                baseclasses = [ 'CacheCaseBase' ], **kwargs)
+
+    def test_warm_cache(self):
+        cold = self._discover(prescan = True,
+                cache = pitest.DiscoverCache(self.cache_fname))
+        self.assertTrue(os.path.exists(self.cache_fname))
+        self._unload()
+
+        # Nothing is imported, not even files prescan would skip
+        cache = pitest.DiscoverCache(self.cache_fname)
+        warm = self._discover(cache = cache)
+        self.assertFalse(self._loaded())
+        self.assertEqual([ name for name, cls in warm ],
+                [ name for name, cls in cold ])
+        info = dict(warm)[cold[1][0]]
+        self.assertIsInstance(info, pitest.TestCaseInfo)
+        self.assertEqual(info.__name__, 'CacheCase1')
+        self.assertEqual(info.deps, [ 'CacheCase0' ])
+        self.assertEqual(info._get_test_method_names(), ( 'test_a', 'test_b' ))
+
+        class CacheSuite(pitest.TestSuiteBase):
+            testcase_baseclasses = [ 'CacheCaseBase' ]
+        suite = CacheSuite()
+        suite.discover(self.tmpdir.name, pattern = 'cache_*.py', cache = cache)
+        graph = suite.get_deps_graph()
+        self.assertEqual(graph._out[cold[1][0]], { cold[0][0] })
+        self.assertFalse(self._loaded())
+
+        # Running the test cases loads them
+        result = pitest.Runner.run_test_suite(suite)
+        self.assertEqual(result.num_success, 2)
+        self.assertTrue(self._loaded())
+        self.assertEqual(info.load().__name__, 'CacheCase1')
+
+    def test_invalidation(self):
+        self._discover(prescan = True, cache = pitest.DiscoverCache(self.cache_fname))
+        self._unload()
+
+        # Only the modification time changed, the entry is still used
+        st = os.stat(self.cases_fname)
+        os.utime(self.cases_fname, ns = (st.st_atime_ns, st.st_mtime_ns + 10**9))
+        cache = pitest.DiscoverCache(self.cache_fname)
+        self.assertIsNotNone(cache.lookup(self.cases_fname, [ 'CacheCaseBase' ]))
+        self.assertIsNone(cache.lookup(self.cases_fname, [ 'TestCase' ]))
+
+        # A changed content is not
+        with open(self.cases_fname, 'a') as f:
+            f.write('class CacheCase2(CacheCaseBase):\n    pass\n')
+        cache = pitest.DiscoverCache(self.cache_fname)
+        self.assertIsNone(cache.lookup(self.cases_fname, [ 'CacheCaseBase' ]))
+        testcases = self._discover(prescan = True, cache = cache)
+        self.assertEqual([ cls.__name__ for name, cls in testcases ],
+                [ 'CacheCase0', 'CacheCase1', 'CacheCase2' ])
+
+    def test_bad_file(self):
+        with open(self.cache_fname, 'w') as f:
+            f.write('not json')
+        with self.assertRaises(pitest.CacheError):
+            pitest.DiscoverCache(self.cache_fname)
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 0)
@@ -0,0 +1,129 @@
+import abc
+import pitest
+import unittest
+
+class DepsCase(pitest.TestCase):
+    # test_c* -> test_a, test_b1, test_b2; test_b2 -> test_b1
+    _internal_deps = {
+            'test_c*': [ 'test_a', 'test_b*' ],
+            'test_b2': 'test_b1',
+            'test_none': [ 'test_a' ],
+        }
+    def test_a(self):
+        pass
+    def test_b1(self):
+        pass
+    def test_b2(self):
+        pass
+    def test_c(self):
+        pass
+
+class PatternCaseBase(pitest.TestCase):
+    test_patterns = [ 'check_*', '*_case' ]
+class PatternCase(PatternCaseBase):
+    def check_b(self):
+        pass
+    def check_a(self):
+        pass
+    def check_case(self):
+        pass
+    def test_ignored(self):
+        pass
+
+class TestTestCase(unittest.TestCase):
+
+    def test_test_methods(self):
+        # Patterns of the subclass, in order, each name listed once
+        expected = [ 'check_a', 'check_b', 'check_case' ]
+        self.assertEqual([ name for name, method in
+            PatternCase._get_all_tests_class() ], expected)
+        case = PatternCase()
+        tests = case._get_all_tests()
+        self.assertEqual([ name for name, method in tests ], expected)
+        self.assertEqual(tests[0][1], case.check_a)
+
+    def test_test_methods_invalidation(self):
+        class Base(pitest.TestCase):
+            def test_a(self):
+                pass
+        class Derived(Base):
+            pass
+        self.assertEqual(Derived._get_test_method_names(), ( 'test_a', ))
+        Base.test_b = lambda self: None
+        self.assertEqual(Derived._get_test_method_names(), ( 'test_a', 'test_b' ))
+        del Base.test_a
+        self.assertEqual(Derived._get_test_method_names(), ( 'test_b', ))
+        Derived.test_patterns = [ 'nothing' ]
+        self.assertEqual(Derived._get_test_method_names(), ())
+        self.assertEqual(Base._get_test_method_names(), ( 'test_b', ))
+
+    def test_test_methods_bound_only(self):
+        class Case(pitest.TestCase):
+            def test_a(self):
+                pass
+            @staticmethod
+            def test_static():
+                pass
+            @classmethod
+            def test_class(cls):
+                pass
+        self.assertEqual(Case._get_test_method_names(), ( 'test_a', ))
+
+    def test_abc_mixin(self):
+        class Mixin(abc.ABC):
+            @abc.abstractmethod
+            def helper(self):
+                pass
+        class Case(pitest.TestCase, Mixin):
+            def helper(self):
+                pass
+            def test_a(self):
+                pass
+        self.assertEqual(Case._get_test_method_names(), ( 'test_a', ))
+
+    def test_deps_graph(self):
+        graph = DepsCase().get_deps_graph()
+        self.assertEqual(set(graph._nodes), { 'test_a', 'test_b1', 'test_b2', 'test_c' })
+        self.assertEqual(graph._out, {
+            'test_a': set(),
+            'test_b1': set(),
+            'test_b2': { 'test_b1' },
+            'test_c': { 'test_a', 'test_b1', 'test_b2' },
+            })
+        # Nodes are bound to the instance
+        case = DepsCase()
+        self.assertIs(case.get_deps_graph().get_data('test_a').__self__, case)
+
+    def test_deps_graph_cache(self):
+        class CachedCase(pitest.TestCase):
+            _internal_deps = { 'test_b': [ 'test_a' ] }
+            def test_a(self):
+                pass
+            def test_b(self):
+                pass
+        graph1 = CachedCase().get_deps_graph()
+        graph2 = CachedCase().get_deps_graph()
+        self.assertEqual(graph1._out, graph2._out)
+        self.assertEqual(graph2._out['test_b'], { 'test_a' })
+
+        # Assigning new _internal_deps resolves the edges again
+        CachedCase._internal_deps = { 'test_a': [ 'test_b' ] }
+        graph3 = CachedCase().get_deps_graph()
+        self.assertEqual(graph3._out, { 'test_a': { 'test_b' }, 'test_b': set() })
+
+    def test_deps_cycle(self):
+        class CycleCase(pitest.TestCase):
+            _internal_deps = { 'test_a': 'test_b', 'test_b': 'test_c',
+                    'test_c': 'test_a' }
+            def test_a(self):
+                pass
+            def test_b(self):
+                pass
+            def test_c(self):
+                pass
+        for i in range(2):
+            with self.assertRaises(pitest.Py3DAGCycleError):
+                CycleCase().get_deps_graph()
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 0)
@@ -1,4 +1,7 @@
+import copy
+import pickle
 import pitest
+import random
 import unittest
 
 class TestDAG(unittest.TestCase):
@@ -29,5 +32,152 @@ class TestDAG(unittest.TestCase):
         graph.del_edges([ 3 ], [ 2 ])
         self.assertEqual(graph.check_acyclic(), None)
 
+    def test_levels(self):
+        graph = pitest.DAG()
+        for id in 'abcde':
+            graph.add_node(id)
+        # a -> b -> d; a -> c -> d; e
+        graph.add_edges([ 'a' ], [ 'b', 'c' ])
+        graph.add_edges([ 'b', 'c' ], [ 'd' ])
+        self.assertEqual(graph.levels(), [ [ 'd', 'e' ], [ 'b', 'c' ], [ 'a' ] ])
+        self.assertEqual(graph.topological_order(), [ 'd', 'e', 'b', 'c', 'a' ])
+        self.assertEqual(pitest.DAG().levels(), [])
+
+    def test_unreachable_cycle(self):
+        graph = pitest.DAG()
+        for id in 'abcd':
+            graph.add_node(id)
+        # c -> d; a -> b -> c -> a, there is no source to start from
+        graph.add_edge('c', 'd')
+        graph.add_edge('a', 'b')
+        graph.add_edge('b', 'c')
+        graph.add_edge('c', 'a')
+        self.assertIn(graph.check_acyclic(), { ('a', 'b'), ('b', 'c'), ('c', 'a') })
+        with self.assertRaises(pitest.Py3DAGCycleError) as cm:
+            graph.topological_order()
+        self.assertEqual(cm.exception.cycle, [ 'a', 'b', 'c' ])
+        self.assertIn("'a' -> 'b' -> 'c' -> 'a'", str(cm.exception))
+        with self.assertRaises(pitest.Py3DAGError):
+            graph.check_acyclic(raise_error = True)
+
+    def test_reachability(self):
+        graph = pitest.DAG()
+        for id in 'abcdef':
+            graph.add_node(id, id.upper())
+        # a -> b -> d; a -> c -> d -> e; f
+        graph.add_edges([ 'a' ], [ 'b', 'c' ])
+        graph.add_edges([ 'b', 'c' ], [ 'd' ])
+        graph.add_edge('d', 'e')
+        self.assertEqual(graph.descendants('a'), { 'b', 'c', 'd', 'e' })
+        self.assertEqual(graph.descendants('c'), { 'd', 'e' })
+        self.assertEqual(graph.descendants('e'), set())
+        self.assertEqual(graph.ancestors('d'), { 'a', 'b', 'c' })
+        self.assertEqual(graph.ancestors('f'), set())
+        self.assertEqual(graph.closure([ 'b', 'f' ]), { 'b', 'd', 'e', 'f' })
+        self.assertEqual(graph.closure([ 'b', 'c' ], ancestors = True),
+                { 'a', 'b', 'c' })
+
+        # Altering the graph invalidates memoized results
+        graph.add_edge('e', 'f')
+        self.assertEqual(graph.descendants('c'), { 'd', 'e', 'f' })
+        graph.del_edge('a', 'b')
+        self.assertEqual(graph.ancestors('b'), set())
+
+        sub = graph.induced_subgraph([ 'a', 'c', 'e' ])
+        self.assertEqual(list(sub._nodes.items()), [ ('a', 'A'), ('c', 'C'), ('e', 'E') ])
+        self.assertEqual(sub._out, { 'a': { 'c' }, 'c': set(), 'e': set() })
+        self.assertEqual(sub._in, { 'a': set(), 'c': { 'a' }, 'e': set() })
+
+        graph.add_edge('e', 'c', backedge_ok = True)
+        with self.assertRaises(pitest.Py3DAGCycleError):
+            graph.descendants('a')
+
+class TestIncrementalDAG(unittest.TestCase):
+
+    def test_reject_cycle(self):
+        graph = pitest.DAG(incremental = True)
+        for i in range(5):
+            graph.add_node(i)
+        # 0 -> 1 -> 2 -> 3 -> 4, added against the initial order
+        for i in reversed(range(4)):
+            graph.add_edge(i, i + 1)
+        with self.assertRaises(pitest.Py3DAGCycleError) as cm:
+            graph.add_edge(4, 0)
+        self.assertEqual(cm.exception.cycle, [ 4, 0, 1, 2, 3 ])
+        self.assertEqual(graph._in[0], set())
+        with self.assertRaises(pitest.Py3DAGCycleError):
+            graph.add_edge(1, 0)
+        graph.add_edge(0, 4)
+        self.assertEqual(graph.check_acyclic(), None)
+
+        # backedge_ok adds the edge and leaves incremental mode
+        graph.add_edge(4, 0, backedge_ok = True)
+        self.assertFalse(graph.incremental)
+        self.assertIsNotNone(graph.check_acyclic())
+
+    def test_random_edges(self):
+        rand = random.Random(0)
+        graph = pitest.DAG(incremental = True)
+        for i in range(30):
+            graph.add_node(i)
+        for i in range(300):
+            src, dst = rand.randrange(30), rand.randrange(30)
+            if src == dst or dst in graph._out[src]:
+                continue
+            # The edge closes a cycle iff src is reachable from dst.
+            reachable = { dst }
+            stack = [ dst ]
+            while stack:
+                for child in graph._out[stack.pop()]:
+                    if not child in reachable:
+                        reachable.add(child)
+                        stack.append(child)
+            if src in reachable:
+                with self.assertRaises(pitest.Py3DAGCycleError):
+                    graph.add_edge(src, dst)
+            else:
+                graph.add_edge(src, dst)
+            for id, out_list in graph._out.items():
+                for child in out_list:
+                    self.assertLess(graph._ord[id], graph._ord[child])
+
+class TestFrozenDAG(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = pitest.DAG()
+        for id in 'abcd':
+            self.graph.add_node(id, id.upper())
+        # a -> b, c; b -> d; c -> d
+        self.graph.add_edges([ 'a' ], [ 'b', 'c' ])
+        self.graph.add_edges([ 'b', 'c' ], [ 'd' ])
+
+    def test_freeze(self):
+        frozen = self.graph.freeze()
+        self.assertEqual(len(frozen), 4)
+        self.assertIn('a', frozen)
+        self.assertNotIn('e', frozen)
+        self.assertEqual(frozen.ids, [ 'a', 'b', 'c', 'd' ])
+        self.assertEqual(frozen.get_data('c'), 'C')
+        self.assertEqual(list(frozen.out_indices(frozen.index('a'))), [ 1, 2 ])
+        self.assertEqual(list(frozen.in_indices(frozen.index('d'))), [ 1, 2 ])
+        self.assertEqual(frozen.sources, [ 'a' ])
+        self.assertEqual(frozen.sinks, [ 'd' ])
+
+        # A snapshot, altering the DAG does not alter the FrozenDAG
+        self.graph.del_edge('a', 'b')
+        self.assertEqual(frozen.out_degree(frozen.index('a')), 2)
+
+    def test_copy_and_thaw(self):
+        frozen = self.graph.freeze()
+        self.assertIs(frozen.freeze(), frozen)
+        self.assertIs(copy.deepcopy(frozen), frozen)
+        graph = frozen.thaw()
+        self.assertEqual(graph._nodes, self.graph._nodes)
+        self.assertEqual(graph._in, self.graph._in)
+        self.assertEqual(graph._out, self.graph._out)
+        unpickled = pickle.loads(pickle.dumps(frozen))
+        self.assertEqual(unpickled.ids, frozen.ids)
+        self.assertEqual(unpickled._in_idx, frozen._in_idx)
+
 if __name__ == '__main__':
     unittest.main(verbosity = 0)
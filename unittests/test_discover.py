@@ -1,5 +1,7 @@
 import os
 import pitest
+import sys
+import tempfile
 import unittest
 
 class TestDiscover(unittest.TestCase):
@@ -30,6 +32,308 @@ class TestDiscover(unittest.TestCase):
         actual_testcases = set([ x.__name__ for full_name, x in testcases ])
         self.assertEqual(actual_testcases, expected_testcases)
 
+    def test_prescan(self):
+        fnames = sorted(os.path.join(self.test_dir, f)
+                for f in os.listdir(self.test_dir) if f.endswith('.py'))
+        for processes in [ 1, 2 ]:
+            selected = pitest.Discover.prescan(fnames,
+                    baseclasses = [ 'CaseBase1' ], processes = processes)
+            self.assertEqual([ os.path.basename(f) for f in selected ],
+                    [ 'deps.py', 'inter_file_deps.py' ])
+        selected = pitest.Discover.prescan(fnames, baseclasses = [ 'TestCase' ])
+        self.assertEqual([ os.path.basename(f) for f in selected ],
+                [ 'case_base.py', 'deps.py', 'inter_file_deps.py',
+                    'internal_deps.py' ])
+
+        testcases = pitest.Discover.discover(self.test_dir,
+                baseclasses = [ 'CaseBase1' ], prescan = True)
+        self.assertEqual(sorted(testcases), sorted(pitest.Discover.discover(
+            self.test_dir, baseclasses = [ 'CaseBase1' ])))
+
+    def test_prescan_skips_imports(self):
+        # Discovered paths are relative to the working directory.
+        with tempfile.TemporaryDirectory(dir = self.curr_dir) as tmpdir:
+            with open(os.path.join(tmpdir, 'prescan_heavy.py'), 'w') as f:
+                f.write('import no_such_module_for_pitest\n'
+                        'class NotATest(object):\n'
+                        '    pass\n')
+            with open(os.path.join(tmpdir, 'prescan_cases.py'), 'w') as f:
+                f.write('from pitest import TestCase as Base\n'
+                        'Alias = Base\n'
+                        'class PrescanCase(Alias):\n'
+                        '    pass\n')
+            with open(os.path.join(tmpdir, 'prescan_broken.py'), 'w') as f:
+                f.write('class (:\n')
+            selected = pitest.Discover.prescan(sorted(os.path.join(tmpdir, f)
+                for f in os.listdir(tmpdir)))
+            self.assertEqual([ os.path.basename(f) for f in selected ],
+                    [ 'prescan_broken.py', 'prescan_cases.py' ])
+            with self.assertRaises(ImportError):
+                pitest.Discover.discover(tmpdir, pattern = 'prescan_heavy.py')
+            testcases = pitest.Discover.discover(tmpdir,
+                    pattern = 'prescan_[hc]*.py', prescan = True)
+        self.assertEqual([ cls.__name__ for name, cls in testcases ],
+                [ 'PrescanCase' ])
+
+    def test_lazy(self):
+        with tempfile.TemporaryDirectory(dir = self.curr_dir) as tmpdir:
+            with open(os.path.join(tmpdir, 'lazy_cases.py'), 'w') as f:
+                f.write('import pitest\n'
+                        'DEPS = [ "LazyCase0" ]\n'
+                        'class LazyBase(pitest.TestCase):\n'
+                        '    deps = [ "LazyOther" ]\n'
+                        'class LazyCase1(LazyBase):\n'
+                        '    def test_a(self):\n'
+                        '        pass\n'
+                        'class LazyCase0(LazyCase1):\n'
+                        '    deps = []\n'
+                        'class LazyCase2(pitest.TestCase):\n'
+                        '    deps = DEPS\n')
+            with open(os.path.join(tmpdir, 'lazy_other.py'), 'w') as f:
+                f.write('import no_such_module_for_pitest\n'
+                        'from pitest import TestCase\n'
+                        'class LazyOther(TestCase):\n'
+                        '    pass\n')
+            realpath = os.path.realpath(os.path.join(tmpdir, 'lazy_cases.py'))
+            testcases = pitest.Discover.discover(tmpdir,
+                    pattern = 'lazy_*.py', lazy = True)
+            self.assertEqual([ cls.__name__ for name, cls in testcases ],
+                    [ 'LazyBase', 'LazyCase0', 'LazyCase1', 'LazyCase2',
+                      'LazyOther' ])
+            self.assertNotIn(realpath, pitest.discover._modules)
+            infos = { cls.__name__: cls for name, cls in testcases }
+            self.assertEqual(infos['LazyCase0'].deps, [])
+            # Inherited within the file
+            self.assertEqual(infos['LazyCase1'].deps, [ 'LazyOther' ])
+            self.assertNotIn(realpath, pitest.discover._modules)
+
+            # Only the file of the instantiated test case is imported
+            case = infos['LazyCase1']()
+            self.assertIsInstance(case, pitest.TestCase)
+            self.assertIn(realpath, pitest.discover._modules)
+            # Not a literal, taken from the class
+            self.assertEqual(infos['LazyCase2'].deps, [ 'LazyCase0' ])
+            # Derived from a base class, without deps
+            self.assertEqual(infos['LazyOther'].deps, [])
+            with self.assertRaises(ImportError):
+                infos['LazyOther']()
+
+    def test_lazy_deps_graph(self):
+        with tempfile.TemporaryDirectory(dir = self.curr_dir) as tmpdir:
+            with open(os.path.join(tmpdir, 'lazy_graph_a.py'), 'w') as f:
+                f.write('import pitest\n'
+                        'class LazyGraphA(pitest.TestCase):\n'
+                        '    def test_a(self):\n'
+                        '        pass\n')
+            with open(os.path.join(tmpdir, 'lazy_graph_b.py'), 'w') as f:
+                f.write('from pitest import TestCase as Base\n'
+                        'class LazyGraphBase(Base):\n'
+                        '    pass\n'
+                        'class LazyGraphB(LazyGraphBase):\n'
+                        '    deps = [ "LazyGraphA" ]\n')
+            suite = pitest.TestSuiteBase()
+            suite.discover(tmpdir, pattern = 'lazy_graph_*.py', lazy = True)
+            graph = suite.get_deps_graph()
+            names = { name.split('.')[-1]: name for name in graph._nodes }
+            self.assertEqual(graph._out[names['LazyGraphB']],
+                    { names['LazyGraphA'] })
+            self.assertEqual(graph._out[names['LazyGraphBase']], set())
+            self.assertFalse([ module for module in list(sys.modules.values())
+                if 'lazy_graph_' in (getattr(module, '__file__', None) or '') ])
+
+    def test_lazy_local_base(self):
+        with tempfile.TemporaryDirectory(dir = self.curr_dir) as tmpdir:
+            with open(os.path.join(tmpdir, 'lazy_local_a.py'), 'w') as f:
+                f.write('import pitest\n'
+                        'class LocalBase(pitest.TestCase):\n'
+                        '    pass\n')
+            with open(os.path.join(tmpdir, 'lazy_local_b.py'), 'w') as f:
+                # An unrelated class with the name of a test case elsewhere
+                f.write('class LocalBase:\n'
+                        '    pass\n'
+                        'class LocalThing(LocalBase):\n'
+                        '    pass\n')
+            with open(os.path.join(tmpdir, 'lazy_local_c.py'), 'w') as f:
+                f.write('from lazy_local_a import LocalBase\n'
+                        'class LocalCase(LocalBase):\n'
+                        '    pass\n')
+            testcases = pitest.Discover.discover(tmpdir,
+                    pattern = 'lazy_local_*.py', lazy = True)
+            self.assertEqual(sorted(cls.__name__ for name, cls in testcases),
+                    [ 'LocalBase', 'LocalCase' ])
+            self.assertEqual(pitest.Discover.prescan([ os.path.join(tmpdir,
+                'lazy_local_{}.py'.format(c)) for c in 'abc' ]), [
+                    os.path.join(tmpdir, 'lazy_local_{}.py'.format(c))
+                    for c in 'ac' ])
+
+            # A test case parsing found, that the file does not define
+            fname = os.path.join(tmpdir, 'lazy_local_b.py')
+            info = pitest.TestCaseInfo(fname, 'lazy_local_b.LocalThing',
+                    { 'name': 'LocalThing' }, [ 'TestCase' ], lazy = True)
+            with self.assertRaises(pitest.DiscoverError):
+                info.load()
+
+    def test_lazy_deps_forms(self):
+        with tempfile.TemporaryDirectory(dir = self.curr_dir) as tmpdir:
+            with open(os.path.join(tmpdir, 'lazy_forms.py'), 'w') as f:
+                f.write('import pitest\n'
+                        'class FormA(pitest.TestCase):\n'
+                        '    pass\n'
+                        'class FormAnn(pitest.TestCase):\n'
+                        '    deps: list = [ "FormA" ]\n'
+                        'class FormAug(pitest.TestCase):\n'
+                        '    deps = []\n'
+                        '    deps += [ "FormA" ]\n'
+                        'class FormIf(pitest.TestCase):\n'
+                        '    deps = []\n'
+                        '    if True:\n'
+                        '        deps = [ "FormA" ]\n'
+                        'class FormPlain(pitest.TestCase):\n'
+                        '    deps = [ "FormA" ]\n'
+                        '    def helper(self):\n'
+                        '        deps = None\n')
+            testcases = pitest.Discover.discover(tmpdir,
+                    pattern = 'lazy_forms.py', lazy = True)
+            # Only the plain assignment is known without importing the file
+            self.assertEqual([ cls.__name__ for name, cls in testcases
+                if 'deps' in vars(cls) ], [ 'FormA', 'FormPlain' ])
+
+            def edges(lazy):
+                suite = pitest.TestSuiteBase()
+                suite.discover(tmpdir, pattern = 'lazy_forms.py', lazy = lazy)
+                graph = suite.get_deps_graph()
+                return { (src.split('.')[-1], dst.split('.')[-1])
+                        for src in graph._nodes for dst in graph._out[src] }
+            expected = { (name, 'FormA') for name in
+                    [ 'FormAnn', 'FormAug', 'FormIf', 'FormPlain' ] }
+            self.assertEqual(edges(True), expected)
+            self.assertEqual(edges(False), expected)
+
+    def test_load_module(self):
+        with tempfile.TemporaryDirectory(dir = self.curr_dir) as tmpdir:
+            for dirname, deps in [ ('a', 'A'), ('b', 'B') ]:
+                os.mkdir(os.path.join(tmpdir, dirname))
+                with open(os.path.join(tmpdir, dirname, 'util_mod.py'), 'w') as f:
+                    f.write('import pitest\n'
+                            'class UtilCase(pitest.TestCase):\n'
+                            '    deps = [ "{}" ]\n'.format(deps))
+            with open(os.path.join(tmpdir, 'a', 'user_mod.py'), 'w') as f:
+                f.write('import util_mod\n'
+                        'class UserCase(util_mod.UtilCase):\n'
+                        '    pass\n')
+            try:
+                (name_a, cls_a), = pitest.Discover.load_file(
+                        os.path.join(tmpdir, 'a', 'util_mod.py'))
+                (name_b, cls_b), = pitest.Discover.load_file(
+                        os.path.join(tmpdir, 'b', 'util_mod.py'))
+                # Same base name, distinct modules
+                self.assertEqual((cls_a.deps, cls_b.deps), ([ 'A' ], [ 'B' ]))
+                self.assertNotEqual(cls_a.__module__, cls_b.__module__)
+                # Executed once, also when imported by base name
+                self.assertIs(pitest.Discover.load_file(
+                    os.path.join(tmpdir, 'a', 'util_mod.py'))[0][1], cls_a)
+                module = pitest.Discover.load_module(
+                        os.path.join(tmpdir, 'a', 'user_mod.py'))
+                self.assertIs(module.UserCase.__bases__[0], cls_a)
+            finally:
+                for module_name in [ 'util_mod', 'user_mod' ]:
+                    sys.modules.pop(module_name, None)
+
+    def test_load_module_names(self):
+        with tempfile.TemporaryDirectory(dir = self.curr_dir) as tmpdir:
+            # Named after a module of the standard library
+            fname = os.path.join(tmpdir, 'colorsys.py')
+            with open(fname, 'w') as f:
+                f.write('SHADOW = True\n')
+            imported = sys.modules.get('colorsys')
+            try:
+                module = pitest.Discover.load_module(fname)
+                self.assertTrue(module.SHADOW)
+                self.assertIsNot(sys.modules.get('colorsys'), module)
+            finally:
+                if imported is None:
+                    sys.modules.pop('colorsys', None)
+
+            # Nor under the path-derived name, when at the top of the working
+            # directory
+            old_cwd = os.getcwd()
+            imported = sys.modules.get('tabnanny')
+            with open(os.path.join(tmpdir, 'tabnanny.py'), 'w') as f:
+                f.write('SHADOW = True\n')
+            os.chdir(tmpdir)
+            try:
+                module = pitest.Discover.load_module('tabnanny.py')
+                self.assertTrue(module.SHADOW)
+                self.assertNotEqual(module.__name__, 'tabnanny')
+                self.assertIsNot(sys.modules.get('tabnanny'), module)
+            finally:
+                os.chdir(old_cwd)
+                if imported is None:
+                    sys.modules.pop('tabnanny', None)
+
+            # The entry of the directory already on sys.path stays there
+            os.mkdir(os.path.join(tmpdir, 'own'))
+            fname = os.path.join(tmpdir, 'own', 'own_mod.py')
+            open(fname, 'w').close()
+            sys.path.insert(0, os.path.realpath(os.path.dirname(fname)))
+            path = list(sys.path)
+            try:
+                pitest.Discover.load_module(fname)
+                self.assertEqual(sys.path, path)
+            finally:
+                del sys.path[0]
+                sys.modules.pop('own_mod', None)
+
+    def test_load_file_once_per_class(self):
+        with tempfile.TemporaryDirectory(dir = self.curr_dir) as tmpdir:
+            fname = os.path.join(tmpdir, 'diamond_cases.py')
+            with open(fname, 'w') as f:
+                f.write('import pitest\n'
+                        'class BaseA(pitest.TestCase):\n'
+                        '    pass\n'
+                        'class BaseB(BaseA):\n'
+                        '    pass\n'
+                        'class Case0(BaseB):\n'
+                        '    pass\n'
+                        'class Case1(BaseA, pitest.TestCase):\n'
+                        '    pass\n')
+            testcases = pitest.Discover.load_file(fname,
+                    baseclasses = [ 'BaseA', 'BaseB', 'TestCase' ])
+        self.assertEqual([ cls.__name__ for name, cls in testcases ],
+                [ 'BaseA', 'BaseB', 'Case0', 'Case1' ])
+
+    def test_walk(self):
+        with tempfile.TemporaryDirectory(dir = self.curr_dir) as tmpdir:
+            for fname in [ 'a.py', 'b.txt', 'sub/c.py', 'sub/d_test.py',
+                    '.git/e.py', 'node_modules/f.py', 'env/pyvenv.cfg',
+                    'env/g.py', 'build/h.py', 'sub/gen/i.py', 'sub/gen/keep.py',
+                    'sub/j.py' ]:
+                fname = os.path.join(tmpdir, fname)
+                os.makedirs(os.path.dirname(fname), exist_ok = True)
+                open(fname, 'w').close()
+            with open(os.path.join(tmpdir, '.gitignore'), 'w') as f:
+                f.write('# comment\nbuild/\n/j.py\n')
+            with open(os.path.join(tmpdir, 'sub', '.gitignore'), 'w') as f:
+                f.write('gen/*\n!keep.py\n/j.py\n')
+
+            def walk(**kwargs):
+                return sorted(os.path.relpath(fname, tmpdir)
+                        for fname in pitest.Discover.walk(tmpdir, **kwargs))
+            self.assertEqual(walk(), [ 'a.py', 'build/h.py', 'sub/c.py',
+                'sub/d_test.py', 'sub/gen/i.py', 'sub/gen/keep.py', 'sub/j.py' ])
+            self.assertEqual(walk(gitignore = True), [ 'a.py', 'sub/c.py',
+                'sub/d_test.py', 'sub/gen/keep.py' ])
+            self.assertEqual(walk(pattern = [ '*_test.py', '*.txt' ],
+                exclude = [ 'sub/gen' ]), [ 'b.txt', 'sub/d_test.py' ])
+            self.assertEqual(len(walk(exclude = [])), 10)
+            # Other patterns than the default ones, still skipping env
+            self.assertEqual(walk(exclude = [ 'sub' ], skip_venv = True),
+                [ '.git/e.py', 'a.py', 'build/h.py', 'node_modules/f.py' ])
+            self.assertEqual(walk(recursive = False), [ 'a.py' ])
+            # Paths are relative to the working directory
+            self.assertTrue(all(not os.path.isabs(fname)
+                for fname in pitest.Discover.walk(tmpdir)))
+
 class TestDiscoverInternals(unittest.TestCase):
 
     def test_convert_path(self):
@@ -0,0 +1,120 @@
+import os
+import pitest
+import socket
+import tempfile
+import threading
+import unittest
+
+# A -> B: A depends on B
+#   0 ---> 1 ---> 3
+#    \           /
+#     --> 2 ----
+#          \
+#           --> 4 (fails)
+
+class DistCaseBase(pitest.TestCase):
+    def test_foo(self):
+        pass
+class DistCase0(DistCaseBase):
+    deps = [ 'DistCase1', 'DistCase2' ]
+class DistCase1(DistCaseBase):
+    deps = [ 'DistCase3' ]
+class DistCase2(DistCaseBase):
+    deps = [ 'DistCase3', 'DistCase4' ]
+class DistCase3(DistCaseBase):
+    pass
+class DistCase4(DistCaseBase):
+    def test_bar(self):
+        return 'failed'
+class DistCase5(DistCaseBase):
+    pass
+
+class DistSuite(pitest.TestSuiteBase):
+    testcase_baseclasses = [ 'DistCaseBase' ]
+
+class TestDistributed(unittest.TestCase):
+
+    def setUp(self):
+        self.suite = DistSuite()
+        self.suite.load_file(os.path.relpath(__file__))
+
+    def _run_with_workers(self, coordinator, num_workers, *, start = None):
+        counts = []
+        def work():
+            if start:
+                start.wait()
+            counts.append(pitest.Worker(self.suite, coordinator.address).run())
+        threads = [ threading.Thread(target = work) for i in range(num_workers) ]
+        for thread in threads:
+            thread.start()
+        result = coordinator.run(timeout = 10)
+        for thread in threads:
+            thread.join()
+        return result, counts
+
+    def test_tcp(self):
+        expected = pitest.Runner.run_test_suite(self.suite)
+        with pitest.Coordinator(self.suite, ('127.0.0.1', 0)) as coordinator:
+            actual, counts = self._run_with_workers(coordinator, 3)
+        self.assertEqual(str(actual), str(expected))
+        self.assertEqual(sum(counts), 4)
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'requires Unix domain sockets')
+    def test_unix(self):
+        expected = pitest.Runner.run_test_suite(self.suite)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            address = os.path.join(tmpdir, 'coordinator.sock')
+            with pitest.Coordinator(self.suite, address) as coordinator:
+                actual, counts = self._run_with_workers(coordinator, 2)
+            self.assertFalse(os.path.exists(address))
+        self.assertEqual(str(actual), str(expected))
+
+    def test_requeue_on_disconnect(self):
+        expected = pitest.Runner.run_test_suite(self.suite)
+        with pitest.Coordinator(self.suite, ('127.0.0.1', 0)) as coordinator:
+            # A worker that takes the first test case and dies. The other worker
+            # only connects afterwards.
+            dead = threading.Event()
+            def die():
+                with socket.create_connection(coordinator.address) as sock:
+                    pitest.distributed._recv(sock)
+                    pitest.distributed._recv(sock)
+                dead.set()
+            thread = threading.Thread(target = die)
+            thread.start()
+            actual, counts = self._run_with_workers(coordinator, 1, start = dead)
+            thread.join()
+        self.assertEqual(str(actual), str(expected))
+        self.assertEqual(counts, [ 4 ])
+
+    def test_retries(self):
+        with pitest.Coordinator(self.suite, ('127.0.0.1', 0)) as coordinator:
+            # DistCase3, the first test case, kills both workers it is handed
+            # to. It fails, the other worker runs the rest.
+            dead = threading.Event()
+            def die():
+                for i in range(2):
+                    with socket.create_connection(coordinator.address) as sock:
+                        pitest.distributed._recv(sock)
+                        self.assertEqual(pitest.distributed._recv(sock),
+                                ('run', __name__ + '.DistCase3'))
+                dead.set()
+            thread = threading.Thread(target = die)
+            thread.start()
+            actual, counts = self._run_with_workers(coordinator, 1, start = dead)
+            thread.join()
+        self.assertEqual(counts, [ 2 ])
+        self.assertEqual(actual.num_failure, 2)
+        failed, = [ testcase_result for testcase_result in actual.testcase_results
+                if testcase_result.name == __name__ + '.DistCase3' ]
+        self.assertFalse(failed.success)
+        self.assertEqual(actual.num_blocked, 2)
+        self.assertEqual(actual.num_unknown, 1)
+
+    def test_timeout(self):
+        with pitest.Coordinator(self.suite, ('127.0.0.1', 0)) as coordinator:
+            with self.assertRaises(pitest.DistributedError):
+                coordinator.run(timeout = 0.1)
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 0)
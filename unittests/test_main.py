@@ -62,6 +62,8 @@ python3 -m pitest \\
         expected = '''\
 Case4.__init__(Anndee, kwarg0 = KoolArg)
 Case4.test_bar(naathing, kwarg1 = at owl)  <===  Only Case4 has test_bar()
+pitest.unittests.test_main_dir.cases.Case4: finished 1 tests
+
 '''
         self.assertEqual(actual, expected)
 
@@ -78,8 +80,33 @@ python3 -m pitest \\
         expected = '''\
 Case4.__init__(Bashii, kwarg0 = KoolArg2)
 Case4.test_bar(naathing, kwarg1 = at owlll)  <===  Only Case4 has test_bar()
+pitest.unittests.test_main_dir.cases.Case4: finished 1 tests
+
 '''
         self.assertEqual(actual, expected)
 
+    def test_run_test_kind(self):
+        cmdstr = '''\
+python3 -m pitest \\
+            --start-dir pitest/unittests/test_main_dir \\
+            run test Case4.test_bar \\
+            --args-file pitest/unittests/test_main_dir/args1.py
+'''
+        actual = subprocess.check_output(cmdstr, shell = True).decode('utf8')
+        self.assertIn('pitest.unittests.test_main_dir.cases.Case4: finished 1 tests',
+            actual)
+
+    def test_run_no_match(self):
+        # A test name is not a test case name
+        cmdstr = '''\
+python3 -m pitest \\
+            --start-dir pitest/unittests/test_main_dir \\
+            run case Case4.test_bar 2> /dev/null
+'''
+        with self.assertRaises(subprocess.CalledProcessError) as cm:
+            subprocess.check_output(cmdstr, shell = True)
+        self.assertEqual(cm.exception.returncode, 1)
+        self.assertEqual(cm.exception.output, b'')
+
 if __name__ == '__main__':
     unittest.main()
@@ -87,5 +87,42 @@ class TestName(unittest.TestCase):
             for needle in needles:
                 self.assertFalse(pitest.PyName.re_match(haystack, needle))
 
+    def test_re_compile(self):
+        needles = ( 'foo.Case1', '.Case1', 'Case10', 'bar.Case2' )
+        regex = pitest.PyName.re_compile(needles)
+        self.assertIs(pitest.PyName.re_compile(needles), regex)
+        for haystack in [ 'foo.bar.Case1', 'foo.Case1', 'Case10', 'foo.bar.Case2',
+                'foo.bar.Case100', 'bar.Case1', 'xCase1' ]:
+            self.assertEqual(not regex.match(haystack) is None,
+                    any(pitest.PyName.re_match(haystack, needle)
+                        for needle in needles), haystack)
+
+class TestNameIndex(unittest.TestCase):
+
+    def test_match(self):
+        index = pitest.NameIndex([ 'foo.bar.Case1', 'foo.bar.Case100',
+            'foo.baz.Case1', 'Case1', 'foo.bar.CaseX1' ])
+        self.assertEqual(len(index), 5)
+        samples = [
+                ('Case1', [ 'foo.bar.Case1', 'foo.baz.Case1', 'Case1' ]),
+                ('bar.Case1', [ 'foo.bar.Case1' ]),
+                ('foo.bar.Case1', [ 'foo.bar.Case1' ]),
+                ('foo.Case1', []),
+                ('.Case1', []),
+                ('Case10', []),
+                ('ase1', []),
+                ('Case1*', [ 'foo.bar.Case1', 'foo.bar.Case100',
+                    'foo.baz.Case1', 'Case1' ]),
+                ('ba?.Case1', [ 'foo.bar.Case1', 'foo.baz.Case1' ]),
+                ('foo.*.Case1', [ 'foo.bar.Case1', 'foo.baz.Case1' ]),
+                ('*1', [ 'foo.bar.Case1', 'foo.baz.Case1', 'Case1',
+                    'foo.bar.CaseX1' ]),
+                # Not a regular expression, '.' and '+' are literal
+                ('Case.1', []),
+                ('Case+1', []),
+        ]
+        for pattern, expected in samples:
+            self.assertEqual(index.match(pattern), expected, pattern)
+
 if __name__ == '__main__':
     unittest.main(verbosity = 0)
@@ -0,0 +1,99 @@
+import os
+import pitest
+import tempfile
+import unittest
+
+# A -> B: A depends on B
+#   Chain2 ---> Chain1 ---> Chain0
+#   Alone
+class PriorityCaseBase(pitest.TestCase):
+    def test_foo(self):
+        pass
+class Alone(PriorityCaseBase):
+    pass
+class Chain0(PriorityCaseBase):
+    pass
+class Chain1(PriorityCaseBase):
+    deps = [ 'Chain0' ]
+class Chain2(PriorityCaseBase):
+    deps = [ 'Chain1' ]
+
+class PrioritySuite(pitest.TestSuiteBase):
+    testcase_baseclasses = [ 'PriorityCaseBase' ]
+
+class TestCriticalPath(unittest.TestCase):
+
+    def setUp(self):
+        # Same shape as in test_scheduler.py.
+        self.graph = pitest.DAG()
+        for i in range(5):
+            self.graph.add_node(i)
+        self.graph.add_edges([ 0 ], [ 1, 2, 3, 4 ])
+        self.graph.add_edges([ 1 ], [ 3, 4 ])
+        self.graph.add_edges([ 2 ], [ 3, 4 ])
+        self.graph.add_edges([ 3 ], [ 4 ])
+
+    def test_unit_weights(self):
+        path = pitest.CriticalPath(self.graph)
+        lengths = [ path.length(i) for i in range(5) ]
+        self.assertEqual(lengths, [ 1, 2, 2, 3, 4 ])
+        self.assertEqual(sorted(range(5), key = path.key), [ 4, 3, 1, 2, 0 ])
+
+    def test_durations(self):
+        history = pitest.DurationHistory()
+        history.durations.update({ 0: 1.0, 1: 5.0, 2: 1.0, 4: 2.0 })
+        path = pitest.CriticalPath(self.graph, history)
+        lengths = [ path.length(i) for i in range(5) ]
+        # 3 has no recorded duration and weighs the average, 2.25.
+        self.assertEqual(lengths, [ 1.0, 6.0, 2.0, 8.25, 10.25 ])
+        self.assertEqual(sorted([ 1, 2 ], key = path.key), [ 1, 2 ])
+
+    def test_cycle(self):
+        self.graph.add_edge(4, 0, backedge_ok = True)
+        with self.assertRaises(pitest.PriorityError):
+            pitest.CriticalPath(self.graph)
+
+class TestDurationHistory(unittest.TestCase):
+
+    def test_update_save_load(self):
+        suite = PrioritySuite()
+        suite.load_file(os.path.relpath(__file__))
+        result = pitest.Runner.run_test_suite(suite)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'durations.json')
+            history = pitest.DurationHistory(fname)
+            self.assertEqual(history.durations, {})
+            history.update(result)
+            history.save()
+            loaded = pitest.DurationHistory(fname)
+        self.assertEqual(loaded.durations, history.durations)
+        self.assertEqual(set(loaded.durations), {
+            'test_priority.Alone', 'test_priority.Chain0',
+            'test_priority.Chain1', 'test_priority.Chain2' })
+        for duration in loaded.durations.values():
+            self.assertGreaterEqual(duration, 0)
+
+    def test_bad_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'durations.json')
+            with open(fname, 'w') as f:
+                f.write('[ 1, 2 ]')
+            with self.assertRaises(pitest.PriorityError):
+                pitest.DurationHistory(fname)
+
+class TestRunnerPriority(unittest.TestCase):
+
+    def test_critical_path_first(self):
+        suite = PrioritySuite()
+        suite.load_file(os.path.relpath(__file__))
+        path = pitest.CriticalPath(suite.get_deps_graph())
+        expected_order = [ 'test_priority.Chain0', 'test_priority.Chain1',
+                'test_priority.Alone', 'test_priority.Chain2' ]
+        for workers in [ 1, 3 ]:
+            result = pitest.Runner.run_test_suite(suite, workers = workers,
+                    priority = path.key)
+            actual_order = [ x.name for x in result.testcase_results ]
+            self.assertEqual(actual_order, expected_order)
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 0)
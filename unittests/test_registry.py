@@ -0,0 +1,66 @@
+import os
+import pitest
+import unittest
+
+class RegCaseBase(pitest.TestCase):
+    def test_foo(self):
+        pass
+class RegCase0(RegCaseBase):
+    pass
+class RegCase1(RegCaseBase):
+    deps = [ 'RegCase0' ]
+    class Nested(RegCaseBase):
+        pass
+class RegHelper(RegCaseBase):
+    register = False
+class RegCase2(RegHelper):
+    pass
+
+class RegSuite(pitest.TestSuiteBase):
+    testcase_baseclasses = [ 'RegCaseBase' ]
+
+class TestRegistry(unittest.TestCase):
+
+    def test_load_modules(self):
+        testcases = pitest.Registry.load_modules([ __name__ ],
+                baseclasses = [ 'RegCaseBase' ])
+        # Neither nested classes nor RegHelper are registered.
+        self.assertEqual(testcases, [
+            (__name__ + '.RegCase0', RegCase0),
+            (__name__ + '.RegCase1', RegCase1),
+            (__name__ + '.RegCase2', RegCase2),
+            ])
+
+    def test_same_as_load_file(self):
+        # Base classes are matched by name, like load_file() does.
+        from_file = pitest.Discover.load_file(os.path.relpath(__file__),
+                baseclasses = [ 'RegHelper' ])
+        self.assertEqual([ cls for name, cls in from_file ], [ RegCase2 ])
+        testcases = pitest.Registry.testcases([ __name__ ],
+                baseclasses = [ 'RegHelper' ])
+        self.assertEqual(testcases, [ (__name__ + '.RegCase2', RegCase2) ])
+
+    def test_locals_not_registered(self):
+        class LocalCase(RegCaseBase):
+            pass
+        names = [ name for name, cls in pitest.Registry.testcases([ __name__ ]) ]
+        self.assertIn(__name__ + '.RegCaseBase', names)
+        self.assertFalse([ name for name in names if 'LocalCase' in name ])
+
+    def test_bad_module(self):
+        with self.assertRaises(pitest.RegistryError):
+            pitest.Registry.load_modules([ 'no_such_module_for_pitest' ])
+
+    def test_suite(self):
+        suite = RegSuite()
+        suite.load_modules([ __name__ ])
+        graph = suite.get_deps_graph()
+        self.assertEqual(graph._out[__name__ + '.RegCase1'], { __name__ + '.RegCase0' })
+        result = pitest.Runner.run_test_suite(suite)
+        self.assertEqual(result.num_success, 3)
+
+        with self.assertRaises(pitest.suite.NoTestCaseLoadedError):
+            RegSuite().load_entry_points('pitest.no_such_group')
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 0)
@@ -3,6 +3,7 @@ import io
 import os
 import pitest
 import sys
+import threading
 import unittest
 
 # A -> B: A depends on B
@@ -75,6 +76,70 @@ class DemoCase12(CaseBaseTmp2):
 class TestSuiteDemo2(pitest.TestSuiteBase):
     testcase_baseclasses = [ 'CaseBaseTmp2' ]
 
+class CaseBaseTmp3(pitest.TestCase):
+    pass
+class DemoCase20(CaseBaseTmp3):
+    barrier = threading.Barrier(2, timeout = 10)
+    def test_wait(self):
+        # Only passes if DemoCase21 runs at the same time.
+        self.barrier.wait()
+class DemoCase21(CaseBaseTmp3):
+    def test_wait(self):
+        DemoCase20.barrier.wait()
+class DemoCase22(CaseBaseTmp3):
+    deps = [ 'DemoCase20' ]
+    def test_fail(self):
+        return 'failed'
+class DemoCase23(CaseBaseTmp3):
+    deps = [ 'DemoCase21', 'DemoCase22' ]
+class DemoCase24(CaseBaseTmp3):
+    deps = [ 'DemoCase23' ]
+
+class TestSuiteDemo3(pitest.TestSuiteBase):
+    testcase_baseclasses = [ 'CaseBaseTmp3' ]
+
+class CaseBaseTmp4(pitest.TestCase):
+    parent_pid = os.getpid()
+    def test_pid(self):
+        if os.getpid() == self.parent_pid:
+            return 'not run in a worker process'
+class DemoCase30(CaseBaseTmp4):
+    pass
+class DemoCase31(CaseBaseTmp4):
+    deps = [ 'DemoCase30' ]
+class DemoCase32(CaseBaseTmp4):
+    deps = [ 'DemoCase30' ]
+
+class TestSuiteDemo4(pitest.TestSuiteBase):
+    testcase_baseclasses = [ 'CaseBaseTmp4' ]
+
+class ParallelMethodsCase(pitest.TestCase):
+    parallel_methods = 2
+    _internal_deps = { 'test_last': [ 'test_wait*' ] }
+    def __init__(self):
+        self.barrier = threading.Barrier(2, timeout = 10)
+        self.lock = threading.Lock()
+        self.events = []
+    def _log(self, event):
+        with self.lock:
+            self.events.append(event)
+    def setup_instance(self):
+        self._log('setup_instance')
+    def teardown_instance(self):
+        self._log('teardown_instance')
+    def setup(self):
+        self._log('setup')
+    def teardown(self):
+        self._log('teardown')
+    def test_wait1(self):
+        # Only passes if test_wait2 runs at the same time.
+        self.barrier.wait()
+    def test_wait2(self):
+        self.barrier.wait()
+    def test_last(self):
+        self._log('test_last')
+        return 'failed'
+
 class TestRunner(unittest.TestCase):
     # This test uses the golden file approach.
 
@@ -122,5 +187,86 @@ PASS
 """
         self.assertEqual(str(result), expected_result_string)
 
+    def test_run_suite_threads(self):
+        fname = os.path.relpath(__file__)
+        suite = TestSuiteDemo1()
+        suite.load_file(fname)
+        expected = pitest.Runner.run_test_suite(suite)
+        for workers in [ 2, 4, 16 ]:
+            actual = pitest.Runner.run_test_suite(suite, workers = workers)
+            self.assertEqual(str(actual), str(expected))
+
+    def test_run_suite_threads_concurrently(self):
+        fname = os.path.relpath(__file__)
+        suite = TestSuiteDemo3()
+        suite.load_file(fname)
+        result = pitest.Runner.run_test_suite(suite, workers = 2)
+        expected_result_string = """\
+(no args)
+test_runner.DemoCase20: finished 1 tests
+test_runner.DemoCase21: finished 1 tests
+test_runner.DemoCase22: finished 0 tests
+    FAILURE: 1
+        test_runner.DemoCase22.test_fail: failed
+test_runner.DemoCase23: blocked by ['test_runner.DemoCase22']
+================================================================
+
+SUCCESS: 2
+FAILURE: 1
+BLOCKED: 1
+UNKNOWN: 1
+
+FAIL
+"""
+        self.assertEqual(str(result), expected_result_string)
+
+    def test_run_suite_bad_workers(self):
+        suite = TestSuiteDemo1()
+        with self.assertRaises(pitest.RunnerError):
+            pitest.Runner.run_test_suite(suite, workers = 0)
+        with self.assertRaises(pitest.RunnerError):
+            pitest.Runner.run_test_suite(suite, workers = 2, executor = 'foo')
+
+    def test_run_case_parallel_methods(self):
+        case = ParallelMethodsCase()
+        result = pitest.Runner.run_test_case(case)
+        expected_result_string = """\
+ParallelMethodsCase: finished 2 tests
+    FAILURE: 1
+        ParallelMethodsCase.test_last: failed
+"""
+        self.assertEqual(str(result), expected_result_string)
+        self.assertEqual(result._success, [ 'test_wait1', 'test_wait2' ])
+        self.assertEqual(case.events[0], 'setup_instance')
+        self.assertEqual(case.events[-3:], [ 'test_last', 'teardown', 'teardown_instance' ])
+        self.assertEqual(case.events.count('setup'), 3)
+        self.assertEqual(case.events.count('teardown'), 3)
+
+    def test_run_case_bad_parallel_methods(self):
+        case = ParallelMethodsCase()
+        case.parallel_methods = -1
+        with self.assertRaises(pitest.RunnerError):
+            pitest.Runner.run_test_case(case)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork()')
+    def test_run_suite_processes(self):
+        fname = os.path.relpath(__file__)
+        suite = TestSuiteDemo1()
+        suite.load_file(fname)
+        expected = pitest.Runner.run_test_suite(suite)
+        actual = pitest.Runner.run_test_suite(suite, workers = 3,
+                executor = 'process')
+        self.assertEqual(str(actual), str(expected))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork()')
+    def test_run_suite_processes_forked(self):
+        fname = os.path.relpath(__file__)
+        suite = TestSuiteDemo4()
+        suite.load_file(fname)
+        result = pitest.Runner.run_test_suite(suite, workers = 2,
+                executor = 'process')
+        self.assertTrue(result.success)
+        self.assertEqual(result.num_success, 3)
+
 if __name__ == '__main__':
     unittest.main(verbosity = 0)
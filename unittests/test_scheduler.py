@@ -1,4 +1,5 @@
 import pitest
+import threading
 import unittest
 
 class TestScheduler(unittest.TestCase):
@@ -95,5 +96,189 @@ class TestScheduler(unittest.TestCase):
         sched.deliver_tasks({2})
         self.assertEqual( sched.blocked_tasks.keys(), set() )
 
+    def test_unknown_tasks(self):
+        """
+        Tasks stalled by blocked tasks are unknown, until the failed task is
+        re-fetched.
+        """
+        sched = self.sched
+        sched.reset()
+        sched.fetch_task(4)
+        sched.deliver_task(4)
+        # 3 is still running, nothing is blocked or unknown
+        sched.fetch_task(3)
+        self.assertEqual( sched.unknown_tasks, [] )
+
+        # failing 3 blocks 1 and 2 directly, 0 indirectly
+        sched.fail_task(3)
+        self.assertEqual( sched.blocked_tasks, {0: {3}, 1: {3}, 2: {3}} )
+        self.assertEqual( sched.unknown_tasks, [] )
+        self.assertEqual( sched.available_tasks, set() )
+
+        # re-fetching 3 undoes all of it
+        sched.fetch_task(3, failed_ok = True)
+        self.assertEqual( sched.blocked_tasks, {} )
+        self.assertEqual( sched.unknown_tasks, [] )
+        sched.deliver_task(3)
+        sched.fetch_task(1)
+        sched.fail_task(1)
+        self.assertEqual( sched.blocked_tasks, {0: {1}} )
+        self.assertEqual( sched.unknown_tasks, [] )
+
+    def test_unknown_tasks_chain(self):
+        graph = pitest.DAG()
+        for i in range(4):
+            graph.add_node(i)
+        # 3 -> 2 -> 1 -> 0
+        for i in range(3):
+            graph.add_edge(i + 1, i)
+        sched = pitest.Scheduler(graph)
+        sched.fetch_task(0)
+        sched.fail_task(0)
+        self.assertEqual( sched.blocked_tasks, {1: {0}} )
+        self.assertEqual( sched.unknown_tasks, [2, 3] )
+        sched.fetch_task(0, failed_ok = True)
+        self.assertEqual( sched.unknown_tasks, [] )
+        sched.fail_task(0)
+        self.assertEqual( sched.unknown_tasks, [2, 3] )
+
+    def test_status_and_redelivery(self):
+        sched = self.sched
+        sched.reset()
+        self.assertEqual(sched.status(4), 'untouched')
+        sched.fetch_task(4)
+        self.assertEqual(sched.status(4), 'fetched')
+        sched.deliver_task(4)
+        self.assertEqual(sched.status(4), 'delivered')
+        with self.assertRaises(pitest.SchedulerError):
+            sched.deliver_task(4, nofetch_ok = True)
+        self.assertEqual(sched.available_tasks, {3})
+
+    def test_wide_fan_in(self):
+        """
+        A task becomes available only after all of its prerequisites are
+        delivered, in whatever order.
+        """
+        graph = pitest.DAG()
+        graph.add_node(100)
+        for i in range(100):
+            graph.add_node(i)
+            graph.add_edge(100, i)
+        sched = pitest.Scheduler(graph)
+        self.assertEqual(sched.available_tasks, set(range(100)))
+        for i in reversed(range(100)):
+            sched.fetch_task(i)
+            sched.deliver_task(i)
+            expected = {100} if i == 0 else set(range(i))
+            self.assertEqual(sched.available_tasks, expected)
+
+    def test_pop_next(self):
+        sched = self.sched
+        sched.reset()
+        self.assertEqual(sched.pop_next(), 4)
+        self.assertEqual(sched.status(4), 'fetched')
+        self.assertIsNone(sched.pop_next())
+        sched.deliver_task(4)
+        self.assertEqual(sched.pop_next(), 3)
+        sched.deliver_task(3)
+        # 1 is fetched by someone else, pop_next() skips it.
+        sched.fetch_task(1)
+        self.assertEqual(sched.pop_next(), 2)
+        self.assertIsNone(sched.pop_next())
+
+    def test_frozen_dag(self):
+        graph = pitest.DAG()
+        for i in range(3):
+            graph.add_node(i)
+        graph.add_edges([ 0 ], [ 1, 2 ])
+        frozen = graph.freeze()
+        sched1 = pitest.Scheduler(frozen)
+        sched2 = pitest.Scheduler(frozen)
+        self.assertIs(sched1._dag, sched2._dag)
+        sched1.fetch_tasks({1, 2})
+        sched1.deliver_tasks({1, 2})
+        self.assertEqual( sched1.available_tasks, {0} )
+        self.assertEqual( sched2.available_tasks, {1, 2} )
+
+        # A DAG is frozen by the scheduler, later changes are not seen
+        sched3 = pitest.Scheduler(graph)
+        graph.del_edge(0, 1)
+        self.assertEqual( sched3.available_tasks, {1, 2} )
+
+    def test_pop_next_priority(self):
+        graph = pitest.DAG()
+        for i in range(10):
+            graph.add_node(i)
+        sched = pitest.Scheduler(graph, priority = lambda id: (id % 3, id))
+        order = [ sched.pop_next() for i in range(10) ]
+        self.assertEqual(order, [ 0, 3, 6, 9, 1, 4, 7, 2, 5, 8 ])
+        self.assertIsNone(sched.pop_next())
+
+class TestConcurrentScheduler(unittest.TestCase):
+
+    def setUp(self):
+        # Same graph as TestScheduler.
+        self.graph = pitest.DAG()
+        for i in range(5):
+            self.graph.add_node(i)
+        self.graph.add_edges([ 0 ], [ 1, 2, 3, 4 ])
+        self.graph.add_edges([ 1 ], [ 3, 4 ])
+        self.graph.add_edges([ 2 ], [ 3, 4 ])
+        self.graph.add_edges([ 3 ], [ 4 ])
+
+    def _consume(self, sched, num_threads, fail = ()):
+        lock = threading.Lock()
+        done = []
+        def work():
+            while True:
+                task_id = sched.acquire_next(timeout = 10)
+                if task_id is pitest.ConcurrentScheduler.DRAINED:
+                    return
+                self.assertIsNotNone(task_id)
+                with lock:
+                    done.append(task_id)
+                if task_id in fail:
+                    sched.fail_task(task_id)
+                else:
+                    sched.deliver_task(task_id)
+        threads = [ threading.Thread(target = work) for i in range(num_threads) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return done
+
+    def test_acquire_all(self):
+        sched = pitest.ConcurrentScheduler(self.graph)
+        done = self._consume(sched, 4)
+        self.assertEqual(done[:2], [ 4, 3 ])
+        self.assertEqual(set(done[2:4]), { 1, 2 })
+        self.assertEqual(done[4], 0)
+        self.assertEqual(sched.acquire_next(), pitest.ConcurrentScheduler.DRAINED)
+
+    def test_acquire_with_failure(self):
+        sched = pitest.ConcurrentScheduler(self.graph)
+        done = self._consume(sched, 3, fail = { 2 })
+        self.assertEqual(sorted(done), [ 1, 2, 3, 4 ])
+        self.assertEqual(sched.blocked_tasks, { 0: { 2 } })
+
+    def test_acquire_timeout(self):
+        sched = pitest.ConcurrentScheduler(self.graph)
+        self.assertEqual(sched.acquire_next(), 4)
+        # 4 is running, nothing else can be fetched until it is delivered.
+        self.assertIsNone(sched.acquire_next(timeout = 0.01))
+        timer = threading.Timer(0.05, sched.deliver_task, [ 4 ])
+        timer.start()
+        self.assertEqual(sched.acquire_next(timeout = 10), 3)
+        timer.join()
+
+    def test_priority(self):
+        sched = pitest.ConcurrentScheduler(self.graph, priority = lambda id: -id)
+        for task_id in [ 4, 3 ]:
+            self.assertEqual(sched.acquire_next(), task_id)
+            sched.deliver_task(task_id)
+        self.assertEqual(sched.acquire_next(), 2)
+        self.assertEqual(sched.acquire_next(), 1)
+
 if __name__ == '__main__':
     unittest.main(verbosity = 0)
@@ -0,0 +1,121 @@
+import pitest
+import unittest
+
+RUN = []
+
+class SelCaseBase(pitest.TestCase):
+    def setup_instance(self):
+        RUN.append(self.__class__.__name__)
+    def test_a(self):
+        RUN.append('test_a')
+class SelCase0(SelCaseBase):
+    def test_b(self):
+        RUN.append('test_b')
+class SelCase1(SelCaseBase):
+    deps = [ 'SelCase0' ]
+    _internal_deps = { 'test_slow_d': 'test_c' }
+    def test_c(self):
+        RUN.append('test_c')
+    def test_slow_d(self):
+        RUN.append('test_slow_d')
+class SelCase2(SelCaseBase):
+    pass
+
+class SelSuite(pitest.TestSuiteBase):
+    testcase_baseclasses = [ 'SelCaseBase' ]
+
+class TestSelector(unittest.TestCase):
+    testcases = [ (__name__ + '.' + cls.__name__, cls)
+            for cls in [ SelCase0, SelCase1, SelCase2 ] ]
+
+    def select(self, targets = None, keyword = None, kind = None,
+            testcases = None):
+        selector = pitest.Selector(targets, keyword = keyword, kind = kind)
+        return { fullname.split('.')[-1]: names for fullname, names
+                in selector.select(testcases or self.testcases).items() }
+
+    def test_targets(self):
+        self.assertEqual(self.select(), { 'SelCase0': None, 'SelCase1': None,
+            'SelCase2': None })
+        self.assertEqual(self.select([ 'SelCase0', 'SelCase1.test_c' ]),
+                { 'SelCase0': None, 'SelCase1': ( 'test_c', ) })
+        self.assertEqual(self.select([ 'test_?' ], kind = 'method'), {
+            'SelCase0': None, 'SelCase1': ( 'test_a', 'test_c' ),
+            'SelCase2': None })
+        # Matches the end of names after a dot only
+        self.assertEqual(self.select([ 'Case0', 'est_a' ]), {})
+
+    def test_kind(self):
+        self.assertEqual(self.select([ 'SelCase0', 'SelCase1.test_c' ],
+            kind = 'case'), { 'SelCase0': None })
+        self.assertEqual(self.select([ 'SelCase0', 'SelCase1.test_c' ],
+            kind = 'test'), { 'SelCase1': ( 'test_c', ) })
+        # Without a dot, a target only names test cases, unless told otherwise
+        self.assertEqual(self.select([ 'test_c' ]), {})
+        self.assertEqual(self.select([ 'test_c' ], kind = 'method'),
+                { 'SelCase1': ( 'test_c', ) })
+        with self.assertRaises(pitest.SelectionError):
+            pitest.Selector([ 'SelCase0' ], kind = 'nothing')
+
+    def test_lazy(self):
+        # Test methods are only listed when a target may name one of them.
+        listed = []
+        class Info(object):
+            def __init__(self, cls):
+                self.cls = cls
+            def _get_test_method_names(self):
+                listed.append(self.cls.__name__)
+                return self.cls._get_test_method_names()
+        testcases = [ (fullname, Info(cls)) for fullname, cls in self.testcases ]
+        self.assertEqual(self.select([ 'SelCase0', 'SelCase1.test_c' ],
+            testcases = testcases), { 'SelCase0': None,
+                'SelCase1': ( 'test_c', ) })
+        self.assertEqual(listed, [ 'SelCase1' ])
+        del listed[:]
+        self.assertEqual(self.select([ 'SelCase2' ], kind = 'case',
+            testcases = testcases), { 'SelCase2': None })
+        self.assertEqual(listed, [])
+
+    def test_keyword(self):
+        self.assertEqual(self.select(keyword = 'SLOW'),
+                { 'SelCase1': ( 'test_slow_d', ) })
+        self.assertEqual(self.select(keyword = 'case1 and not (slow or test_a)'),
+                { 'SelCase1': ( 'test_c', ) })
+        self.assertEqual(self.select([ 'SelCase0', 'SelCase2' ], keyword = 'test_b'),
+                { 'SelCase0': ( 'test_b', ) })
+        for keyword in [ '', 'a and', '(a', 'a)', 'not', 'a b' ]:
+            with self.assertRaises(pitest.SelectionError):
+                pitest.Selector(keyword = keyword)
+
+class TestSuiteSelect(unittest.TestCase):
+
+    def setUp(self):
+        del RUN[:]
+        self.suite = SelSuite()
+        self.suite.load_modules([ __name__ ])
+
+    def test_prerequisites(self):
+        selected = self.suite.select([ 'SelCase1.test_slow_d' ])
+        self.assertEqual(selected, { __name__ + '.SelCase1': ( 'test_slow_d', ) })
+        graph = self.suite.get_deps_graph()
+        self.assertEqual(set(graph._nodes), { __name__ + '.SelCase0',
+            __name__ + '.SelCase1' })
+        result = pitest.Runner.run_test_suite(self.suite)
+        self.assertTrue(result.success)
+        # All of the prerequisite test case, the selected test and its
+        # prerequisite within the test case.
+        self.assertEqual(RUN, [ 'SelCase0', 'test_a', 'test_b',
+            'SelCase1', 'test_c', 'test_slow_d' ])
+
+        # Select all again
+        self.suite.select()
+        self.assertEqual(len(self.suite.get_deps_graph()._nodes), 3)
+
+    def test_no_match(self):
+        self.assertEqual(self.suite.select(keyword = 'nothing'), {})
+        result = pitest.Runner.run_test_suite(self.suite)
+        self.assertEqual(result.num_testcases, 0)
+        self.assertEqual(RUN, [])
+
+if __name__ == '__main__':
+    unittest.main(verbosity = 0)
@@ -5,6 +5,19 @@ import unittest
 class TestSuiteDemo1(pitest.TestSuiteBase):
     testcase_baseclasses = [ 'CaseBase1' ]
 
+# CycleCase0 -> CycleCase2 -> CycleCase1 -> CycleCase0
+class CycleCaseBase(pitest.TestCase):
+    pass
+class CycleCase0(CycleCaseBase):
+    deps = [ 'CycleCase2' ]
+class CycleCase1(CycleCaseBase):
+    deps = [ 'CycleCase0' ]
+class CycleCase2(CycleCaseBase):
+    deps = [ 'CycleCase1' ]
+
+class CycleSuite(pitest.TestSuiteBase):
+    testcase_baseclasses = [ 'CycleCaseBase' ]
+
 class TestSuite(unittest.TestCase):
     curr_dir = os.path.dirname(os.path.realpath(__file__))
     test_dir = os.path.join(curr_dir, 'test_dir')
@@ -58,5 +71,28 @@ class TestSuite(unittest.TestCase):
         self.assertEqual(graph._in, expected_in)
         self.assertEqual(graph._out, expected_out)
 
+    def test_suite_deps_graph_cache(self):
+        suite = TestSuiteDemo1()
+        suite.discover(self.test_dir)
+        graph1 = suite.get_deps_graph()
+        graph2 = suite.get_deps_graph()
+        self.assertIsNot(graph1, graph2)
+        self.assertEqual(graph1._out, graph2._out)
+
+        # Adding test cases resolves deps again
+        suite._add_testcases([ ('extra.DemoCase1', CycleCaseBase) ])
+        graph3 = suite.get_deps_graph()
+        self.assertEqual(graph3._out['test_dir.deps.DemoCase0'], {
+            'test_dir.deps.DemoCase1', 'test_dir.deps.DemoCase2',
+            'extra.DemoCase1' })
+
+    def test_suite_deps_cycle(self):
+        suite = CycleSuite()
+        suite.load_file(os.path.relpath(__file__))
+        with self.assertRaises(pitest.Py3DAGCycleError) as cm:
+            suite.get_deps_graph()
+        self.assertEqual(cm.exception.cycle, [ 'test_suite.CycleCase0',
+            'test_suite.CycleCase2', 'test_suite.CycleCase1' ])
+
 if __name__ == '__main__':
     unittest.main(verbosity = 0)